@@ -1,8 +1,17 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response
+from flask.json.provider import DefaultJSONProvider
 import mcp_helper
+import mcp_json
+import metrics
+import tracing
+import mcp_logging
+import mcp_capture
+import tenants
 import os
-import json
+import queue
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 # =============================================================================
 # About this MCP Server
@@ -18,9 +27,33 @@ import logging
 # =============================================================================
 
 
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    Serialize JSON-RPC responses with mcp_json (compact, orjson when available).
+    """
+
+    def dumps(self, obj, **kwargs):
+        return mcp_json.dumps(obj)
+
+
 # Initialize Flask application
 app = Flask(__name__)
-logging.basicConfig(level=logging.INFO)
+app.json = CompactJSONProvider(app)
+mcp_logging.configure()
+
+# Worker pool for JSON-RPC batch requests. Kept separate from the pools in
+# mcp_helper so a batch entry can never wait on its own pool.
+batch_workers = int(os.getenv("MCP_BATCH_WORKERS", "8"))
+batch_executor = ThreadPoolExecutor(max_workers=batch_workers, thread_name_prefix="mcp-batch")
+
+# Streamable HTTP: tool calls answered over SSE run on their own pool while
+# the request thread streams progress back to the client
+stream_workers = int(os.getenv("MCP_STREAM_WORKERS", "32"))
+stream_executor = ThreadPoolExecutor(max_workers=stream_workers, thread_name_prefix="mcp-stream")
+
+# Seconds between SSE keep-alive comments while a tool call is still running
+sse_keepalive = float(os.getenv("MCP_SSE_KEEPALIVE_SECONDS", "15"))
+
 
 @app.route('/mcp', methods=['POST'])
 def mcp_endpoint():
@@ -31,12 +64,31 @@ def mcp_endpoint():
       - tools/list
       - tools/call
       - notifications/* (no-op; MUST NOT return JSON-RPC body)
+      - JSON-RPC batches (array of the above, dispatched concurrently)
+      - Streamable HTTP: tools/call answered over SSE with
+        notifications/progress when the client accepts text/event-stream
+    With MCP_TRACE on, responses carry Server-Timing and X-Request-Id.
+    With MCP_CAPTURE_PATH set, requests are recorded for bench/replay.py.
+    """
+    with tracing.tracing(request.headers.get('X-Request-Id')) as trace:
+        response = app.make_response(handle_mcp_request(trace))
+        response.headers.update(tracing.response_headers(trace))
+    return response
+
+
+def handle_mcp_request(trace):
+    """
+    Parse, authenticate and dispatch one POST /mcp request.
+
+    :param trace: Active tracing.Trace, or None
+    :return: Flask response value
     """
     request_id = None
 
     # Robust JSON parse
     try:
-        data = request.get_json(force=True)
+        with tracing.span("parse"):
+            data = request.get_json(force=True)
     except Exception as e:
         app.logger.exception("Parse error in /mcp")
         return jsonify({
@@ -45,70 +97,248 @@ def mcp_endpoint():
             "id": None
         }), 200
 
-    method = data.get("method")
-    params = data.get("params", {})
-    request_id = data.get("id")
-
-    app.logger.info("MCP request: method=%s id=%s", method, request_id)
+    if isinstance(data, dict):
+        request_id = data.get("id")
 
-    # AUTH
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
+    # AUTH (checked once, also for a whole batch); the token selects the site
+    with tracing.span("auth"):
+        tenant, auth_error = authenticate(request.headers.get('Authorization'))
+    if auth_error:
         return jsonify({
             "jsonrpc": "2.0",
             "error": {
                 "code": -32000,
-                "message": "Unauthorized: Missing or invalid Authorization header"
+                "message": auth_error
             },
             "id": request_id
         }), 401
 
+    stream = wants_event_stream(request.headers.get('Accept'), data)
+    mcp_capture.record(data, stream=stream, size=request.content_length)
+
+    with tenants.activate(tenant):
+        if isinstance(data, list):
+            return handle_batch(data)
+
+        if stream:
+            # Headers go out before the call runs, so Server-Timing only covers
+            # parse and auth for streamed responses. The body is read after
+            # this block exits, so hold the tenant until the call is over and
+            # the response closed (even if the client goes away first)
+            release = tenants.hold(tenant)
+            events, future = stream_message(data)
+            response = Response(
+                events,
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+            response.call_on_close(lambda: future.add_done_callback(lambda _: release()))
+            return response
+
+        with tracing.span("dispatch"):
+            response = handle_message(data)
+    if response is None:
+        return ("", 204)  # No Content
+
+    response = tracing.with_debug(response, trace)
+    with tracing.span("serialize"):
+        body = jsonify(response)
+    return body, 200
 
-    # token = os.getenv('MCP_TOKEN')
-    token = auth_header.split(' ')[1]    
-    if token != os.getenv('MCP_TOKEN'):
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus metrics for this server process (see metrics.py).
+    """
+    if not metrics.enabled:
+        return ("Not Found", 404)
+    if not metrics.check_token(request.headers.get('Authorization')):
+        return ("Unauthorized", 401)
+    return Response(metrics.render(), content_type=metrics.content_type)
+
+
+def authenticate(auth_header):
+    """
+    Validate the bearer token on an MCP request and find the WordPress site
+    (tenant) it belongs to.
+
+    :param auth_header: Value of the Authorization header (or None)
+    :return: Tuple of (tenants.Tenant, None), or (None, error message) when unauthorized
+    """
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None, "Unauthorized: Missing or invalid Authorization header"
+
+    token = auth_header.split(' ')[1]
+    tenant = tenants.registry.resolve(token)
+    if tenant is None:
+        return None, "Unauthorized: Invalid MCP Auth token"
+
+    return tenant, None
+
+
+def wants_event_stream(accept_header, data):
+    """
+    Streamable HTTP: answer a tools/call over SSE when the client accepts
+    text/event-stream, so it sees progress instead of a silent connection.
+    """
+    return (
+        isinstance(data, dict)
+        and data.get("method") == "tools/call"
+        and data.get("id") is not None
+        and "text/event-stream" in (accept_header or "")
+    )
+
+
+def sse_event(message):
+    return f"event: message\ndata: {mcp_json.dumps(message)}\n\n"
+
+
+def start_streamed_call(data, emit):
+    """
+    Run a tools/call on the stream pool, reporting progress via emit.
+
+    :param data: JSON-RPC tools/call message
+    :param emit: fn(message) called from worker threads with each JSON-RPC
+                 notification, then with the final response
+    :return: Future resolving to the JSON-RPC response
+    """
+    meta = (data.get("params") or {}).get("_meta") or {}
+    progress_token = meta.get("progressToken")
+
+    def on_progress(progress, total, message):
+        params = {"progressToken": progress_token, "progress": progress}
+        if total is not None:
+            params["total"] = total
+        if message:
+            params["message"] = message
+        emit({"jsonrpc": "2.0", "method": "notifications/progress", "params": params})
+
+    # Progress notifications are only allowed when the client sent a token
+    reporter = mcp_helper.ProgressReporter(on_progress) if progress_token is not None else None
+
+    def run():
+        with mcp_helper.reporting_progress(reporter):
+            response = handle_message(data)
+        emit(response)
+        return response
+
+    return stream_executor.submit(contextvars.copy_context().run, run)
+
+
+def stream_message(data):
+    """
+    Start a tools/call and return the generator for its SSE response:
+    progress notifications as they happen, keep-alive comments while
+    waiting, and the JSON-RPC response last. The call starts here rather
+    than on the first read of the body, so it runs in the caller's context
+    (tenant, trace).
+
+    :return: Tuple of (SSE generator, future of the call)
+    """
+    events = queue.Queue()
+    future = start_streamed_call(data, events.put)
+    return stream_events(events, future), future
+
+
+def stream_events(events, future):
+    while True:
+        try:
+            message = events.get(timeout=sse_keepalive)
+        except queue.Empty:
+            yield ": keepalive\n\n"
+            continue
+
+        yield sse_event(message)
+
+        if "method" not in message:
+            future.result()
+            return
+
+
+def handle_batch(messages):
+    """
+    Handle a JSON-RPC batch: dispatch every request concurrently and return
+    the array of responses in request order. Notifications get no entry,
+    and a batch of only notifications gets no body at all.
+    """
+    if not messages:
         return jsonify({
             "jsonrpc": "2.0",
-            "error": {
-                "code": -32000,
-                "message": "Unauthorized: Invalid MCP Auth token"
-            },
-            "id": request_id
-        }), 401
+            "error": { "code": -32600, "message": "Invalid Request: empty batch" },
+            "id": None
+        }), 200
+
+    app.logger.info("MCP batch: %d messages", len(messages), extra={"sample": True})
+
+    # Each entry runs in a copy of this context so its upstream requests
+    # are attributed to the traced HTTP request
+    with tracing.span("dispatch"):
+        futures = [
+            batch_executor.submit(contextvars.copy_context().run, handle_message, message)
+            for message in messages
+        ]
+        responses = [future.result() for future in futures]
+    responses = [response for response in responses if response is not None]
+
+    if not responses:
+        return ("", 204)  # No Content
+
+    with tracing.span("serialize"):
+        body = jsonify(responses)
+    return body, 200
+
+
+def handle_message(data):
+    """
+    Handle one JSON-RPC message.
+
+    :param data: Parsed JSON-RPC message
+    :return: JSON-RPC response dict, or None for notifications
+    """
+    if not isinstance(data, dict):
+        return {
+            "jsonrpc": "2.0",
+            "error": { "code": -32600, "message": "Invalid Request" },
+            "id": None
+        }
+
+    method = data.get("method")
+    params = data.get("params", {})
+    request_id = data.get("id")
+
+    app.logger.info("MCP request: method=%s id=%s", method, request_id, extra={"sample": True})
 
     # Handle JSON-RPC notifications: id is None. MUST NOT send a JSON-RPC response body.
     if request_id is None:
         # Known MCP notification after initialize
         if method == "notifications/initialized" or (isinstance(method, str) and method.startswith("notifications/")):
-            app.logger.info("Handled notification: %s (no response body)", method)
-            return ("", 204)  # No Content
+            app.logger.debug("Handled notification: %s (no response body)", method)
+            return None
         # If it's a notification but not recognized, still do not respond with a JSON-RPC body.
         app.logger.info("Unknown notification: %s (no response body)", method)
-        return ("", 204)
+        return None
 
     try:
         # Delegate to the MCP helper for normal request-response methods
         result = mcp_helper.handle_request(method, params)
 
-        # Optional: log previews for debugging
-        if method in ("tools/list", "tools/call"):
-            try:
-                preview = json.dumps(result, ensure_ascii=False)[:300]
-            except Exception:
-                preview = str(result)[:300]
-            app.logger.info("%s result preview: %s", method, preview)
+        # Result previews are debug-only, built lazily and never longer than
+        # MCP_LOG_PREVIEW_CHARS, whatever the size of the result
+        if app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug("%s result preview: %s", method, mcp_logging.Preview(result))
 
-        return jsonify({
+        return {
             "jsonrpc": "2.0",
             "result": result,
             "id": request_id
-        }), 200
+        }
 
     except Exception as e:
         app.logger.exception("Unhandled error in /mcp for method=%s id=%s", method, request_id)
         # For tool execution failures, return tool-level MCP result to keep client happy
         if method == "tools/call":
-            return jsonify({
+            return {
                 "jsonrpc": "2.0",
                 "result": {
                     "isError": True,
@@ -117,14 +347,14 @@ def mcp_endpoint():
                     ]
                 },
                 "id": request_id
-            }), 200
+            }
 
         # Protocol-level fallback
-        return jsonify({
+        return {
             "jsonrpc": "2.0",
             "error": { "code": -32603, "message": f"Internal error: {str(e)}" },
             "id": request_id
-        }), 200
+        }
 
 if __name__ == "__main__":
     # Run Flask development server
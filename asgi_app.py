@@ -0,0 +1,281 @@
+import os
+import json
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from app import app as flask_app, authenticate, handle_message
+import mcp_json
+import metrics
+import tracing
+import mcp_capture
+import tenants
+from app import wants_event_stream, start_streamed_call, sse_event, sse_keepalive
+
+# =============================================================================
+# About this module
+#
+# Asyncio (ASGI) entry point for the MCP server. It serves the same POST /mcp
+# JSON-RPC contract as app.py and reuses its auth check and message handling,
+# which in turn use the tool definitions in mcp_helper.py.
+#
+# The event loop never blocks on WordPress: each tool call runs on a wide
+# thread pool that shares mcp_helper's pooled keep-alive client, so a single
+# process can hold hundreds of tool calls in flight while the origin-facing
+# pools in mcp_helper still bound the load on WordPress.
+#
+# Run with:  uvicorn asgi_app:app   (or MCP_SERVER_MODE=asgi python serve.py)
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# Maximum concurrent in-flight tool calls per process
+tool_workers = int(os.getenv("ASGI_TOOL_WORKERS", "256"))
+tool_executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="mcp-asgi")
+
+# Largest request body accepted on /mcp (base64 image uploads can be large)
+max_body_bytes = int(os.getenv("MCP_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+
+logger = flask_app.logger
+
+
+# =============================================================================
+# ASGI Helpers
+# =============================================================================
+
+async def read_body(receive):
+    """
+    Read the full request body from the ASGI receive channel.
+
+    :return: Body bytes, or None if it exceeded max_body_bytes
+    """
+    chunks = []
+    size = 0
+    more_body = True
+
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return b""
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_body_bytes:
+            return None
+        chunks.append(chunk)
+        more_body = message.get("more_body", False)
+
+    return b"".join(chunks)
+
+
+async def send_response(send, status, payload=None, headers=None):
+    """
+    Send a complete HTTP response. payload is JSON encoded; None sends no body.
+    Traced requests also get Server-Timing and X-Request-Id headers.
+    """
+    with tracing.span("serialize"):
+        body = b"" if payload is None else mcp_json.dumps_bytes(payload)
+    response_headers = [(b"content-length", str(len(body)).encode("ascii"))]
+    if payload is not None:
+        response_headers.append((b"content-type", b"application/json"))
+    headers = dict(headers or {}, **tracing.response_headers(tracing.current()))
+    for name, value in headers.items():
+        response_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+
+    await send({"type": "http.response.start", "status": status, "headers": response_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def header(scope, name):
+    """
+    Look up a request header by (lowercase) name.
+    """
+    name = name.encode("latin-1")
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def run_message(message):
+    """
+    Run one JSON-RPC message on the tool pool without blocking the event loop.
+    The worker runs in a copy of the current context (e.g. the active trace).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(tool_executor, context.run, handle_message, message)
+
+
+async def stream_message(send, data):
+    """
+    Answer a tools/call over SSE (streamable HTTP): progress notifications
+    as they happen, keep-alive comments while waiting, the response last.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    start_streamed_call(data, lambda message: loop.call_soon_threadsafe(events.put_nowait, message))
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no")
+        ]
+    })
+
+    while True:
+        try:
+            message = await asyncio.wait_for(events.get(), timeout=sse_keepalive)
+        except asyncio.TimeoutError:
+            await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+            continue
+
+        final = "method" not in message
+        await send({
+            "type": "http.response.body",
+            "body": sse_event(message).encode("utf-8"),
+            "more_body": not final
+        })
+        if final:
+            return
+
+
+# =============================================================================
+# MCP Endpoint
+# =============================================================================
+
+async def mcp_endpoint(scope, receive, send):
+    """
+    POST /mcp: same behaviour as app.mcp_endpoint, including batches,
+    notifications (204 No Content) and SSE streaming of tools/call.
+    """
+    with tracing.tracing(header(scope, "x-request-id")) as trace:
+        await handle_mcp_request(scope, receive, send, trace)
+
+
+async def handle_mcp_request(scope, receive, send, trace):
+    body = await read_body(receive)
+    if body is None:
+        return await send_response(send, 413, {
+            "jsonrpc": "2.0",
+            "error": { "code": -32600, "message": "Request body too large" },
+            "id": None
+        })
+
+    # Robust JSON parse
+    try:
+        with tracing.span("parse"):
+            data = json.loads(body)
+    except Exception as e:
+        logger.exception("Parse error in /mcp")
+        return await send_response(send, 200, {
+            "jsonrpc": "2.0",
+            "error": { "code": -32700, "message": f"Parse error: {str(e)}" },
+            "id": None
+        })
+
+    request_id = data.get("id") if isinstance(data, dict) else None
+
+    # AUTH (checked once, also for a whole batch); the token selects the site
+    with tracing.span("auth"):
+        tenant, auth_error = authenticate(header(scope, "authorization"))
+    if auth_error:
+        return await send_response(send, 401, {
+            "jsonrpc": "2.0",
+            "error": { "code": -32000, "message": auth_error },
+            "id": request_id
+        })
+
+    stream = wants_event_stream(header(scope, "accept"), data)
+    mcp_capture.record(data, stream=stream, size=len(body))
+
+    with tenants.activate(tenant):
+        return await dispatch(send, data, stream, trace)
+
+
+async def dispatch(send, data, stream, trace):
+    """
+    Answer an authenticated /mcp request (runs with its tenant active).
+    """
+    if isinstance(data, list):
+        if not data:
+            return await send_response(send, 200, {
+                "jsonrpc": "2.0",
+                "error": { "code": -32600, "message": "Invalid Request: empty batch" },
+                "id": None
+            })
+
+        logger.info("MCP batch: %d messages", len(data))
+        with tracing.span("dispatch"):
+            responses = await asyncio.gather(*(run_message(message) for message in data))
+        responses = [response for response in responses if response is not None]
+
+        if not responses:
+            return await send_response(send, 204)
+        return await send_response(send, 200, responses)
+
+    if stream:
+        return await stream_message(send, data)
+
+    with tracing.span("dispatch"):
+        response = await run_message(data)
+    if response is None:
+        return await send_response(send, 204)
+    return await send_response(send, 200, tracing.with_debug(response, trace))
+
+
+async def metrics_endpoint(scope, send):
+    """
+    GET /metrics: Prometheus metrics for this process.
+    """
+    if not metrics.check_token(header(scope, "authorization")):
+        return await send_response(send, 401, {"error": "Unauthorized"})
+
+    body = metrics.render().encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", metrics.content_type.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("ascii"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            tool_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    ASGI application.
+    """
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == "/metrics" and scope["method"] == "GET" and metrics.enabled:
+        return await metrics_endpoint(scope, send)
+
+    if scope["path"] != "/mcp":
+        return await send_response(send, 404, {"error": "Not Found"})
+
+    if scope["method"] != "POST":
+        return await send_response(send, 405, {"error": "Method Not Allowed"}, {"Allow": "POST"})
+
+    await mcp_endpoint(scope, receive, send)
+
@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from run import percentile
+
+# =============================================================================
+# About this module
+#
+# Load generator that replays recorded MCP traffic against a running server.
+# The input is a JSON lines file as written by the capture mode in
+# mcp_capture.py (MCP_CAPTURE_PATH): {"ts": ..., "stream": ..., "body": ...}.
+# Bare JSON-RPC messages or batches, one per line, are accepted too.
+#
+# Arrivals are open-loop: each request is sent at its scheduled time
+# whether or not earlier ones have finished, as real clients would, so a
+# server that falls behind shows up as queueing (lag) rather than as a
+# slower send rate. The schedule is either the recorded one, compressed
+# with --speed, or a fixed --rate (optionally Poisson). --concurrency caps
+# the requests in flight on the client side.
+#
+# Usage: python bench/replay.py traffic.jsonl --url http://127.0.0.1:8000/mcp --speed 10
+# =============================================================================
+
+
+# =============================================================================
+# Traces
+# =============================================================================
+
+def load_trace(path):
+    """
+    Read a capture file.
+
+    :return: List of entries {"ts": float or None, "stream": bool, "body": ...}
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Skipping line {number}: not JSON", file=sys.stderr)
+                continue
+
+            if isinstance(record, dict) and "body" in record:
+                entries.append({"ts": record.get("ts"), "stream": bool(record.get("stream")), "body": record["body"]})
+            elif isinstance(record, (dict, list)):
+                entries.append({"ts": None, "stream": False, "body": record})
+
+    # Sort by arrival time if every entry has one
+    if entries and all(entry["ts"] is not None for entry in entries):
+        entries.sort(key=lambda entry: entry["ts"])
+    return entries
+
+
+def schedule(entries, args):
+    """
+    Offsets in seconds from the start of the run at which to send each
+    entry (repeated args.loop times).
+    """
+    offsets = []
+    recorded = bool(entries) and all(entry["ts"] is not None for entry in entries)
+    cursor = 0.0
+
+    for _ in range(args.loop):
+        previous = None
+        for entry in entries:
+            if args.rate:
+                gap = random.expovariate(args.rate) if args.poisson else 1.0 / args.rate
+            elif recorded and previous is not None:
+                gap = max(entry["ts"] - previous, 0.0) / args.speed
+                if args.max_gap is not None:
+                    gap = min(gap, args.max_gap)
+            else:
+                # No timing: send as fast as --concurrency allows
+                gap = 0.0
+            if offsets:
+                cursor += gap
+            previous = entry["ts"]
+            offsets.append(cursor)
+
+    return offsets
+
+
+def label(body):
+    """
+    Name used to group results: the tool for tools/call, else the method.
+    """
+    if isinstance(body, list):
+        return "batch"
+    if not isinstance(body, dict):
+        return "invalid"
+    if body.get("method") == "tools/call":
+        return (body.get("params") or {}).get("name") or "tools/call"
+    return body.get("method") or "invalid"
+
+
+# =============================================================================
+# Replay
+# =============================================================================
+
+class Replayer:
+    """
+    Sends entries to the server, one requests.Session per worker thread.
+    """
+
+    def __init__(self, url, token, timeout):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, entry):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+
+        headers = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+        if entry["stream"]:
+            headers["Accept"] = "application/json, text/event-stream"
+
+        started = time.perf_counter()
+        try:
+            response = session.post(self.url, data=json.dumps(entry["body"]), headers=headers, timeout=self.timeout)
+            content = response.content
+        except requests.RequestException as e:
+            return time.perf_counter() - started, type(e).__name__, False
+        elapsed = time.perf_counter() - started
+
+        return elapsed, response.status_code, response.status_code < 400 and not _has_error(response, content)
+
+
+def _has_error(response, content):
+    # JSON-RPC errors and failed tool calls count as errors; for SSE the
+    # final event is the response
+    if not content:
+        return False
+    text = content.decode("utf-8", "replace")
+    if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+        events = [line[6:] for line in text.splitlines() if line.startswith("data: ")]
+        text = events[-1] if events else ""
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return True
+
+    for message in body if isinstance(body, list) else [body]:
+        if not isinstance(message, dict):
+            continue
+        if "error" in message or (message.get("result") or {}).get("isError"):
+            return True
+    return False
+
+
+def replay(entries, offsets, args):
+    """
+    Send every entry at its offset and collect (label, lag, latency, status, ok).
+    """
+    replayer = Replayer(args.url, args.token, args.timeout)
+    results = []
+    results_lock = threading.Lock()
+    pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="replay")
+    started = time.perf_counter()
+
+    def run(entry, offset):
+        # Lag: how late the request went out (client queueing when the
+        # server is slower than the arrival rate)
+        lag = time.perf_counter() - started - offset
+        elapsed, status, ok = replayer.send(entry)
+        with results_lock:
+            results.append((label(entry["body"]), lag, elapsed, status, ok))
+
+    for position, offset in enumerate(offsets):
+        delay = offset - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(run, entries[position % len(entries)], offset)
+
+    pool.shutdown(wait=True)
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall, args):
+    def latency_stats(rows):
+        latencies = [row[2] for row in rows]
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if not row[4]),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2)
+        }
+
+    by_label = defaultdict(list)
+    for row in results:
+        by_label[row[0]].append(row)
+
+    lags = [row[1] for row in results]
+    return {
+        "config": {
+            name: getattr(args, name) for name in (
+                "url", "speed", "rate", "poisson", "max_gap", "concurrency", "loop", "limit"
+            )
+        },
+        "duration_seconds": round(wall, 2),
+        "throughput_rps": round(len(results) / wall, 2) if wall else None,
+        "status": dict(Counter(str(row[3]) for row in results)),
+        "lag_p50_ms": round(percentile(lags, 0.50) * 1000, 2),
+        "lag_p99_ms": round(percentile(lags, 0.99) * 1000, 2),
+        "overall": latency_stats(results),
+        "by_tool": {name: latency_stats(rows) for name, rows in sorted(by_label.items())}
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured MCP traffic against a running server")
+    parser.add_argument("trace", help="JSON lines capture file (MCP_CAPTURE_PATH)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/mcp")
+    parser.add_argument("--token", default=os.getenv("MCP_TOKEN", ""))
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression: 10 replays 10x faster")
+    parser.add_argument("--rate", type=float, help="Fixed arrival rate (requests/second) instead of recorded timing")
+    parser.add_argument("--poisson", action="store_true", help="Exponential gaps around --rate")
+    parser.add_argument("--max-gap", type=float, help="Cap idle gaps in the recorded timing (seconds, after --speed)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Most requests in flight")
+    parser.add_argument("--loop", type=int, default=1, help="Replay the trace this many times")
+    parser.add_argument("--limit", type=int, help="Only the first N entries of the trace")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, help="Random seed for --poisson")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.speed <= 0 or (args.rate is not None and args.rate <= 0):
+        raise SystemExit("--speed and --rate must be positive")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    entries = load_trace(args.trace)[:args.limit]
+    if not entries:
+        raise SystemExit(f"No requests in {args.trace}")
+
+    offsets = schedule(entries, args)
+    results, wall = replay(entries, offsets, args)
+    output = json.dumps(summarize(results, wall, args), indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
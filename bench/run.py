@@ -0,0 +1,299 @@
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import resource
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen, Request
+
+# =============================================================================
+# About this module
+#
+# Offline benchmark for the MCP server. Starts bench/stub_wordpress.py as a
+# separate process (so its memory is not counted), points the server at it
+# and drives POST /mcp for every tool listed by tools/list through the
+# Flask app in this process. For each tool it reports the first (cold
+# cache) call, throughput, p50/p99 latency, errors and WordPress requests
+# per call, plus the peak RSS of the server process, as JSON.
+#
+# Usage: python bench/run.py --posts 2000 --latency-ms 40 --output bench_output.json
+# =============================================================================
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+token = "bench-token"
+
+
+# =============================================================================
+# Tool Scenarios
+# =============================================================================
+
+# Each scenario builds the arguments for call number n; every tool in
+# tools/list must have one so new tools cannot silently go unmeasured.
+
+def _content_ids(site, collection, count, n):
+    ids = site[collection]
+    start = (n * count) % max(len(ids), 1)
+    return (ids[start:] + ids[:start])[:count]
+
+
+def _image_b64(n, size):
+    seed = f"bench-image-{n}-{time.monotonic_ns()}".encode("utf-8")
+    return base64.b64encode(b"\x89PNG\r\n\x1a\n" + (seed * (size // len(seed) + 1))[:size]).decode("ascii")
+
+
+def _page(n, html_bytes):
+    paragraph = f"<p>Benchmark page {n} copy.</p>"
+    return {
+        "html": "<html><body>" + paragraph * max(html_bytes // len(paragraph), 1) + "</body></html>",
+        "title": f"Benchmark page {n}",
+        "slug": f"bench/page-{n}-{time.monotonic_ns()}",
+        "page_id": "New",
+        "status": "draft"
+    }
+
+
+scenarios = {
+    "get_wordpress_site_details": lambda site, n, args: {},
+    "get_wordpress_content_by_id": lambda site, n, args: {
+        "content_id": _content_ids(site, "posts", 1, n)[0], "content_type": "post"
+    },
+    "get_wordpress_content_by_ids": lambda site, n, args: {
+        "post_ids": _content_ids(site, "posts", 20, n), "page_ids": _content_ids(site, "pages", 20, n), "format": "text"
+    },
+    "publish_new_page_to_wordpress": lambda site, n, args: _page(n, args.content_bytes),
+    "publish_pages_to_wordpress": lambda site, n, args: {
+        "pages": [_page(n * 10 + k, args.content_bytes) for k in range(10)]
+    },
+    "get_wordpress_image_assets": lambda site, n, args: {"page_size": 100},
+    "upload_image_to_wordpress": lambda site, n, args: (
+        {"img_type": "base64", "base64_img": _image_b64(n, args.image_bytes), "title": f"bench {n}"}
+        if n % 2 else
+        {"img_type": "src_url", "img_src": f"{site['url']}/wp-content/uploads/bench-{n}-{time.monotonic_ns()}.png"}
+    ),
+    "upload_images_to_wordpress": lambda site, n, args: {
+        "images": [
+            {"img_type": "base64", "base64_img": _image_b64(n * 5 + k, args.image_bytes), "title": f"bench {n}-{k}"}
+            for k in range(5)
+        ]
+    }
+}
+
+
+# =============================================================================
+# Helpers
+# =============================================================================
+
+def start_stub(args):
+    """
+    Launch the stub WordPress server and return (process, base URL).
+    """
+    command = [
+        sys.executable, os.path.join(here, "stub_wordpress.py"),
+        "--posts", str(args.posts), "--pages", str(args.pages), "--media", str(args.media),
+        "--content-bytes", str(args.content_bytes), "--image-bytes", str(args.image_bytes),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate)
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    return process, process.stdout.readline().strip()
+
+
+def stub_site(base_url):
+    with urlopen(f"{base_url}/__bench/site") as response:
+        return json.loads(response.read())
+
+
+def stub_stats(base_url, reset=False):
+    if reset:
+        urlopen(Request(f"{base_url}/__bench/reset", method="POST", data=b"")).read()
+        return None
+    with urlopen(f"{base_url}/__bench/stats") as response:
+        return json.loads(response.read())
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Driver:
+    """
+    Sends tools/call requests to the Flask app, one test client per thread.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._local = threading.local()
+
+    def call(self, tool_name, arguments):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.flask_app.test_client()
+
+        started = time.perf_counter()
+        response = client.post(
+            "/mcp",
+            data=json.dumps({
+                "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                "params": {"name": tool_name, "arguments": arguments}
+            }),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        )
+        elapsed = time.perf_counter() - started
+
+        body = response.get_json(silent=True) or {}
+        ok = response.status_code == 200 and "error" not in body and not (body.get("result") or {}).get("isError")
+        return elapsed, ok
+
+
+def clear_caches(tenants):
+    for site in tenants.registry.active():
+        site.inventory_cache.clear()
+        site.content_cache.clear()
+        site.search_indexes.clear()
+        site.page_writes.clear()
+
+
+# =============================================================================
+# Benchmark
+# =============================================================================
+
+def bench_tool(driver, tenants, site, tool_name, args):
+    """
+    One cold call, then args.calls warm calls at args.concurrency.
+    """
+    scenario = scenarios[tool_name]
+
+    clear_caches(tenants)
+    stub_stats(site["url"], reset=True)
+    cold_seconds, cold_ok = driver.call(tool_name, scenario(site, 0, args))
+    cold_upstream = stub_stats(site["url"])["requests"]
+
+    stub_stats(site["url"], reset=True)
+    latencies = []
+    errors = 0 if cold_ok else 1
+
+    def run(n):
+        return driver.call(tool_name, scenario(site, n, args))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for elapsed, ok in pool.map(run, range(1, args.calls + 1)):
+            latencies.append(elapsed)
+            errors += 0 if ok else 1
+    wall = time.perf_counter() - started
+    upstream = stub_stats(site["url"])
+
+    return {
+        "tool": tool_name,
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "cold_ms": round(cold_seconds * 1000, 2),
+        "cold_upstream_requests": cold_upstream,
+        "throughput_rps": round(args.calls / wall, 2) if wall else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "upstream_requests_per_call": round(upstream["requests"] / args.calls, 2),
+        "upstream_routes": upstream["routes"],
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MCP server against a stub WordPress site")
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--media", type=int, default=500)
+    parser.add_argument("--content-bytes", type=int, default=20000)
+    parser.add_argument("--image-bytes", type=int, default=50000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--calls", type=int, default=50, help="Warm calls per tool")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tools", help="Comma-separated subset of tools to run")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    process, base_url = start_stub(args)
+
+    try:
+        # mcp_helper reads its settings at import time
+        os.environ.update({
+            "WORDPRESS_SITE_URL": base_url,
+            "WORDPRESS_USERNAME": "bench",
+            "APPLICATION_PASSWORD": "bench",
+            "MCP_TOKEN": token,
+            "MEDIA_HASH_SEED": "false",
+            "MEDIA_HASH_INDEX_DIR": tempfile.mkdtemp(prefix="wordpress-mcp-bench-"),
+            "MCP_LOG_LEVEL": os.environ.get("MCP_LOG_LEVEL", "WARNING"),
+            # Measure the server rather than the outbound rate limits,
+            # unless they were set explicitly
+            "WORDPRESS_READ_RATE": os.environ.get("WORDPRESS_READ_RATE", "0"),
+            "WORDPRESS_WRITE_RATE": os.environ.get("WORDPRESS_WRITE_RATE", "0")
+        })
+        import app
+        import mcp_helper
+        import tenants
+
+        site = dict(stub_site(base_url), url=base_url)
+
+        tool_names = [tool["name"] for tool in mcp_helper.handle_tools_list()["tools"]]
+        missing = [name for name in tool_names if name not in scenarios]
+        if missing:
+            raise SystemExit(f"No benchmark scenario for: {', '.join(missing)}")
+        if args.tools:
+            tool_names = [name for name in tool_names if name in args.tools.split(",")]
+
+        driver = Driver(app.app)
+        started = time.perf_counter()
+        results = [bench_tool(driver, tenants, site, name, args) for name in tool_names]
+
+        report = {
+            "config": {
+                name: getattr(args, name) for name in (
+                    "posts", "pages", "media", "content_bytes", "image_bytes", "latency_ms",
+                    "jitter_ms", "error_rate", "calls", "concurrency"
+                )
+            },
+            "python": sys.version.split()[0],
+            "json_backend": app.mcp_json.backend,
+            "duration_seconds": round(time.perf_counter() - started, 2),
+            "peak_rss_mb": peak_rss_mb(),
+            "tools": results
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
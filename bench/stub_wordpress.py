@@ -0,0 +1,417 @@
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# =============================================================================
+# About this module
+#
+# Fake WordPress REST server for offline benchmarks. It serves a generated
+# site of configurable size (posts, pages, media) with the parts of the
+# REST API this MCP server uses: paginated collections with X-WP-Total /
+# X-WP-TotalPages, include / modified_after / orderby / _fields filters,
+# single items with ETag and 304 revalidation, page and media writes, the
+# /wp-json/batch/v1 endpoint and image files under /wp-content/uploads/.
+#
+# Latency and errors can be injected to see how the server behaves against
+# a slow or flaky origin. Request counts by route are available on
+# GET /__bench/stats and reset with POST /__bench/reset; GET /__bench/site
+# lists the generated ids. None of these are counted or delayed.
+#
+# Usage: python bench/stub_wordpress.py --port 8765 --posts 2000 --latency-ms 40
+# =============================================================================
+
+
+# =============================================================================
+# Site Data
+# =============================================================================
+
+class Site:
+    """
+    Generated WordPress site held in memory.
+
+    :param posts: Number of posts
+    :param pages: Number of pages
+    :param media: Number of images in the media library
+    :param content_bytes: Approximate size of each post/page's rendered HTML
+    :param image_bytes: Size of each image file
+    """
+
+    def __init__(self, posts=500, pages=200, media=500, content_bytes=20000, image_bytes=50000, base_url=""):
+        self.base_url = base_url
+        self.image_bytes = image_bytes
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.items = {"posts": {}, "pages": {}, "media": {}}
+
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        for collection, count in (("posts", posts), ("pages", pages), ("media", media)):
+            for number in range(count):
+                stamp = (start + timedelta(hours=number)).strftime("%Y-%m-%dT%H:%M:%S")
+                if collection == "media":
+                    self._add_media(stamp, f"image-{number}.png", f"Image {number}")
+                else:
+                    self._add_content(collection, stamp, f"{collection[:-1]} {number}", content_bytes)
+
+    def _new_id(self):
+        item_id = self.next_id
+        self.next_id += 1
+        return item_id
+
+    def _add_content(self, collection, stamp, title, content_bytes, html=None):
+        item_id = self._new_id()
+        slug = title.lower().replace(" ", "-")
+        if html is None:
+            paragraph = f"<p>{title} body text about landing pages, pricing and product updates.</p>"
+            html = (
+                f"<h1>{title}</h1><script>window.dataLayer=window.dataLayer||[];</script>"
+                + paragraph * max(content_bytes // len(paragraph), 1)
+            )
+        item = {
+            "id": item_id,
+            "date": stamp,
+            "modified": stamp,
+            "slug": slug,
+            "status": "publish",
+            "type": collection[:-1],
+            "link": f"{self.base_url}/{slug}/",
+            "title": {"rendered": title},
+            "content": {"rendered": html},
+            "template": ""
+        }
+        self.items[collection][item_id] = item
+        return item
+
+    def _add_media(self, stamp, file_name, alt_text):
+        item_id = self._new_id()
+        item = {
+            "id": item_id,
+            "date": stamp,
+            "modified": stamp,
+            "slug": file_name.rsplit(".", 1)[0],
+            "type": "attachment",
+            "mime_type": "image/png",
+            "source_url": f"{self.base_url}/wp-content/uploads/{file_name}",
+            "alt_text": alt_text,
+            "title": {"rendered": alt_text},
+            "media_details": {"file": f"2020/01/{file_name}", "width": 1200, "height": 800}
+        }
+        self.items["media"][item_id] = item
+        return item
+
+    def image(self, name):
+        seed = hashlib.sha256(name.encode("utf-8")).digest()
+        return b"\x89PNG\r\n\x1a\n" + (seed * (self.image_bytes // len(seed) + 1))[:self.image_bytes]
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _project(item, fields):
+    """
+    Apply a WordPress _fields filter (supports one level of dotted paths).
+    """
+    if not fields:
+        return item
+    result = {}
+    for field in fields.split(","):
+        name, _, child = field.partition(".")
+        if name not in item:
+            continue
+        if child and isinstance(item[name], dict):
+            result.setdefault(name, {})
+            if child in item[name]:
+                result[name][child] = item[name][child]
+        else:
+            result[name] = item[name]
+    return result
+
+
+def _etag(item):
+    return '"' + hashlib.md5(item["modified"].encode("utf-8")).hexdigest() + '"'
+
+
+# =============================================================================
+# REST Routes
+# =============================================================================
+
+def handle(site, method, path, query, body):
+    """
+    Answer one REST request.
+
+    :param path: Route below /wp-json/, e.g. "wp/v2/pages/12"
+    :param query: Dict of query parameters
+    :param body: Parsed JSON body (dict), raw bytes for media uploads, or None
+    :return: Tuple of (status, JSON-serializable body, headers dict)
+    """
+    parts = path.strip("/").split("/")
+
+    if parts == ["batch", "v1"] and method == "POST":
+        responses = []
+        for entry in (body or {}).get("requests", []):
+            sub_path = entry.get("path", "").lstrip("/")
+            status, sub_body, _ = handle(site, entry.get("method", "POST"), sub_path, {}, entry.get("body"))
+            responses.append({"status": status, "body": sub_body, "headers": {}})
+        return 207, {"responses": responses}, {}
+
+    if len(parts) < 3 or parts[:2] != ["wp", "v2"] or parts[2] not in site.items:
+        return 404, {"code": "rest_no_route", "message": "No route was found matching the URL and request method."}, {}
+
+    collection = parts[2]
+    items = site.items[collection]
+
+    # Collection
+    if len(parts) == 3:
+        if method == "GET":
+            return _list(items, query)
+        if method == "POST" and collection == "media":
+            with site.lock:
+                item = site._add_media(_now(), query.get("filename", "upload.png"), query.get("alt_text", ""))
+                if query.get("title"):
+                    item["title"] = {"rendered": query["title"]}
+            return 201, item, {}
+        if method == "POST":
+            with site.lock:
+                item = site._add_content(collection, _now(), (body or {}).get("title") or "Untitled", 0, (body or {}).get("content", ""))
+                _apply(item, body or {})
+            return 201, item, {}
+        return 405, {"code": "rest_no_route"}, {}
+
+    # Single item
+    try:
+        item = items.get(int(parts[3]))
+    except ValueError:
+        item = None
+    if item is None:
+        return 404, {"code": "rest_post_invalid_id", "message": "Invalid post ID."}, {}
+
+    if method == "GET":
+        headers = {"ETag": _etag(item), "Last-Modified": formatdate(usegmt=True)}
+        if query.get("_if_none_match") == headers["ETag"]:
+            return 304, None, headers
+        return 200, _project(item, query.get("_fields")), headers
+
+    if method in ("POST", "PUT"):
+        with site.lock:
+            _apply(item, body or {})
+        return 200, item, {}
+
+    return 405, {"code": "rest_no_route"}, {}
+
+
+def _apply(item, fields):
+    for name, value in fields.items():
+        if name in ("title", "content"):
+            item[name] = {"rendered": value or ""}
+        elif name == "alt_text" or name in ("slug", "status", "template"):
+            item[name] = value
+    item["modified"] = _now()
+
+
+def _list(items, query):
+    per_page = int(query.get("per_page", 10))
+    page = int(query.get("page", 1))
+    if per_page > 100 or per_page < 1:
+        return 400, {"code": "rest_invalid_param", "message": "per_page must be between 1 (inclusive) and 100 (inclusive)"}, {}
+
+    selected = list(items.values())
+    if query.get("include"):
+        wanted = {int(item_id) for item_id in query["include"].split(",") if item_id}
+        selected = [item for item in selected if item["id"] in wanted]
+    if query.get("modified_after"):
+        selected = [item for item in selected if item["modified"] > query["modified_after"]]
+
+    order_key = "modified" if query.get("orderby") == "modified" else "date"
+    selected.sort(key=lambda item: (item[order_key], item["id"]), reverse=query.get("order", "desc") == "desc")
+
+    total = len(selected)
+    total_pages = max((total + per_page - 1) // per_page, 1)
+    if page > total_pages and total:
+        return 400, {"code": "rest_post_invalid_page_number", "message": "The page number requested is larger than the number of pages available."}, {}
+
+    chunk = selected[(page - 1) * per_page:page * per_page]
+    body = [_project(item, query.get("_fields")) for item in chunk]
+    return 200, body, {"X-WP-Total": str(total), "X-WP-TotalPages": str(total_pages)}
+
+
+# =============================================================================
+# HTTP Server
+# =============================================================================
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Buffer each response into a single write (flushed after every request)
+    # and disable Nagle, so small responses are not held back by delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # -----------------------------------
+    # Helpers
+    # -----------------------------------
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body, headers=None, content_type="application/json"):
+        if isinstance(body, (bytes, bytearray)):
+            payload = bytes(body)
+        elif body is None:
+            payload = b""
+        else:
+            payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _inject(self):
+        """
+        Apply configured latency and error injection.
+
+        :return: True when an error response was sent
+        """
+        config = self.server.config
+        if config.latency_ms:
+            jitter = random.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0
+            time.sleep(max(config.latency_ms + jitter, 0) / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            self._send(503, {"code": "stub_injected_error", "message": "Injected error"}, {"Retry-After": "1"})
+            return True
+        return False
+
+    def _count(self, route):
+        stats = self.server.stats
+        with stats["lock"]:
+            stats["requests"] += 1
+            stats["routes"][route] = stats["routes"].get(route, 0) + 1
+
+    # -----------------------------------
+    # Dispatch
+    # -----------------------------------
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        raw = self._read_body() if method in ("POST", "PUT") else b""
+
+        if url.path == "/__bench/stats":
+            stats = self.server.stats
+            with stats["lock"]:
+                snapshot = {"requests": stats["requests"], "routes": dict(stats["routes"])}
+            return self._send(200, snapshot)
+        if url.path == "/__bench/site":
+            site = self.server.site
+            return self._send(200, {collection: list(items) for collection, items in site.items.items()})
+        if url.path == "/__bench/reset":
+            with self.server.stats["lock"]:
+                self.server.stats["requests"] = 0
+                self.server.stats["routes"] = {}
+            return self._send(204, None)
+
+        if url.path.startswith("/wp-content/uploads/"):
+            self._count("file")
+            if self._inject():
+                return
+            return self._send(200, self.server.site.image(url.path), content_type="image/png")
+
+        if not url.path.startswith("/wp-json/"):
+            return self._send(404, {"code": "not_found"})
+
+        route = url.path[len("/wp-json/"):]
+        self._count(method + " " + "/".join("{id}" if part.isdigit() else part for part in route.strip("/").split("/")))
+        if self._inject():
+            return
+
+        if route.strip("/") == "wp/v2/media" and method == "POST":
+            disposition = self.headers.get("Content-Disposition", "")
+            query["filename"] = disposition.split("filename=")[-1].strip('"') if "filename=" in disposition else "upload.png"
+            body = raw
+        else:
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                return self._send(400, {"code": "rest_invalid_json"})
+
+        if method == "GET" and self.headers.get("If-None-Match"):
+            query["_if_none_match"] = self.headers["If-None-Match"]
+
+        status, payload, headers = handle(self.server.site, method, route, query, body)
+        self._send(status, payload, headers)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+
+def make_server(config, port=0):
+    """
+    Build (but do not start) a stub server for config on 127.0.0.1:port.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.stats = {"lock": threading.Lock(), "requests": 0, "routes": {}}
+    server.site = Site(
+        posts=config.posts,
+        pages=config.pages,
+        media=config.media,
+        content_bytes=config.content_bytes,
+        image_bytes=config.image_bytes,
+        base_url=f"http://127.0.0.1:{server.server_address[1]}"
+    )
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake WordPress REST server for benchmarks")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 picks a free port)")
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--media", type=int, default=500)
+    parser.add_argument("--content-bytes", type=int, default=20000, help="Rendered HTML size per post/page")
+    parser.add_argument("--image-bytes", type=int, default=50000, help="Size of each image file")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- variation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with 503")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    config = parse_args()
+    server = make_server(config, config.port)
+    # The first line of output is the base URL, so a parent process can read it
+    print(f"http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
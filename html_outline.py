@@ -0,0 +1,157 @@
+from html.parser import HTMLParser
+
+# =============================================================================
+# About this module
+#
+# Single-pass HTML reducer for get_wordpress_content_by_id. Pages published
+# through this server carry full HTML documents with inline scripts, styles
+# and Google Tag Manager snippets; most agent reads only need the text,
+# headings and links. The parser streams over the HTML once, drops
+# non-content elements and emits either plain text or a compact
+# markdown-style outline.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# Elements whose contents are never useful as page text
+skip_tags = {
+    "title", "script", "style", "noscript", "template", "svg", "iframe",
+    "object", "canvas", "select", "button", "form"
+}
+
+# Elements allowed inside <head>. </head> may be left out, so any other
+# start tag (<body> or body content) ends the head, as it does in browsers
+head_tags = {"title", "meta", "link", "base", "style", "script", "noscript", "template"}
+
+# Elements that start a new line of text
+block_tags = {
+    "address", "article", "aside", "blockquote", "br", "dd", "details", "div",
+    "dl", "dt", "fieldset", "figcaption", "figure", "footer", "h1", "h2",
+    "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p",
+    "pre", "section", "summary", "table", "td", "th", "tr", "ul"
+}
+
+heading_levels = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+# Supported output formats
+formats = ("text", "outline")
+
+
+# =============================================================================
+# Parser
+# =============================================================================
+
+class _ReducingParser(HTMLParser):
+    """
+    Collects visible text line by line. In outline mode headings are
+    prefixed with #, list items with "- ", and links become [text](href).
+    """
+
+    def __init__(self, mode):
+        super().__init__(convert_charrefs=True)
+        self.mode = mode
+        self.lines = []
+        self._parts = []
+        self._prefix = ""
+        self._skip_depth = 0
+        self._in_head = False
+        self._link_href = None
+        self._link_start = 0
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.lines.append(self._prefix + text)
+        self._parts = []
+        self._prefix = ""
+        self._link_start = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "head":
+            self._in_head = True
+            return
+        if self._in_head and tag not in head_tags:
+            self._in_head = False
+
+        if tag in skip_tags:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+
+        if tag in block_tags:
+            self._flush()
+
+        if self.mode != "outline":
+            return
+
+        if tag in heading_levels:
+            self._prefix = "#" * heading_levels[tag] + " "
+        elif tag == "li":
+            self._prefix = "- "
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href and not href.startswith(("#", "javascript:")):
+                self._link_href = href
+                self._link_start = len(self._parts)
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._in_head = False
+            return
+        if tag in skip_tags:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if self._skip_depth:
+            return
+
+        if tag == "a" and self._link_href is not None:
+            text = " ".join("".join(self._parts[self._link_start:]).split())
+            if text:
+                self._parts[self._link_start:] = [f" [{text}]({self._link_href})"]
+            self._link_href = None
+
+        if tag in block_tags:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_head:
+            # Only whitespace belongs in the head itself; text ends it
+            if not data.strip():
+                return
+            self._in_head = False
+        self._parts.append(data)
+
+    def result(self):
+        self.close()
+        self._flush()
+        return "\n".join(self.lines)
+
+
+def reduce_html(html, mode="text"):
+    """
+    Reduce an HTML document or fragment to plain text or an outline.
+
+    :param html: HTML string
+    :param mode: 'text' for plain text, 'outline' for headings/lists/links in
+                 markdown style
+    :return: Reduced string
+
+    The head is dropped even when its end tag is left out:
+
+    >>> reduce_html("<html><head><title>T</title><body><p>Body text</p></body></html>")
+    'Body text'
+    """
+    if mode not in formats:
+        raise ValueError(f"format must be one of: html, {', '.join(formats)}")
+    if not html:
+        return ""
+
+    parser = _ReducingParser(mode)
+    parser.feed(html)
+    return parser.result()
@@ -0,0 +1,113 @@
+import os
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import mcp_json
+
+# =============================================================================
+# About this module
+#
+# Optional traffic capture for POST /mcp. With MCP_CAPTURE_PATH set, every
+# authenticated JSON-RPC request (single message or batch) is appended to
+# that file as one JSON line with its arrival time, so real traffic can be
+# replayed later with bench/replay.py to reproduce production load shapes.
+#
+# Lines are written by a background thread from a bounded queue: a request
+# never waits on the disk, and entries beyond the queue size are dropped and
+# counted. The bearer token and other headers are never recorded, but tool
+# arguments are, so treat capture files like the content they contain.
+#
+# Line format:  {"ts": 1718000000.123, "stream": false, "body": {...}}
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# File to append captured requests to; capture is off when unset
+capture_path = os.getenv("MCP_CAPTURE_PATH")
+enabled = bool(capture_path)
+
+# Share of requests captured
+sample_rate = float(os.getenv("MCP_CAPTURE_SAMPLE_RATE", "1.0"))
+
+# Requests with a larger body (e.g. base64 image uploads) are not captured
+max_body_bytes = int(os.getenv("MCP_CAPTURE_MAX_BYTES", str(1024 * 1024)))
+
+queue_size = int(os.getenv("MCP_CAPTURE_QUEUE_SIZE", "10000"))
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue(maxsize=queue_size)
+_writer = None
+_writer_lock = threading.Lock()
+
+# Entries not written because they were too large or the queue was full
+dropped = 0
+
+
+# =============================================================================
+# Capture
+# =============================================================================
+
+def record(data, stream=False, size=None):
+    """
+    Queue one /mcp request for capture (no-op when capture is off).
+
+    :param data: Parsed JSON-RPC message or batch
+    :param stream: True if the client asked for an SSE response
+    :param size: Raw body size in bytes, when known
+    """
+    global dropped
+
+    if not enabled:
+        return
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    if size is not None and size > max_body_bytes:
+        dropped += 1
+        return
+
+    _start_writer()
+    try:
+        _queue.put_nowait({"ts": round(time.time(), 3), "stream": bool(stream), "body": data})
+    except queue.Full:
+        dropped += 1
+
+
+def _start_writer():
+    global _writer
+
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_entries, name="mcp-capture", daemon=True)
+            _writer.start()
+            atexit.register(_flush)
+
+
+def _write_entries():
+    with open(capture_path, "a", encoding="utf-8") as f:
+        while True:
+            entry = _queue.get()
+            try:
+                f.write(mcp_json.dumps(entry) + "\n")
+                # Flush once the queue is drained rather than per line
+                if _queue.empty():
+                    f.flush()
+            except Exception:
+                logger.exception("Could not write captured request to %s", capture_path)
+            finally:
+                _queue.task_done()
+
+
+def _flush(timeout=2.0):
+    # Give the writer a moment to drain the queue at interpreter exit
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
@@ -1,29 +1,280 @@
 # Install Modules
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import uuid
 import os
 import base64
-import requests
-from requests.auth import HTTPBasicAuth
+import binascii
+import hashlib
+import logging
 import mimetypes
 import uuid
 from urllib.parse import urlparse
 import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import wp_client
+import wp_search
+import tenants
+import mcp_json
+import html_outline
+import metrics
+import tracing
+import mcp_logging
 
 # =============================================================================
 # Variables
 # =============================================================================
 
-# Wordpress Settings
-wordpress_username = os.getenv("WORDPRESS_USERNAME")
-application_password = os.getenv("APPLICATION_PASSWORD")
-site_url = os.getenv("WORDPRESS_SITE_URL")
+# The WordPress site, its client and its caches belong to the tenant of the
+# request being handled: see tenant() and tenants.py
 
 # Blank wordpress template to post html page
 # This must be created and added to your current active template folder
 template_id = "page-full-html.php"
 
+# Concurrency
+# page_executor runs individual WordPress requests (e.g. pages of a crawl) and
+# caps how many are in flight against the origin at once. task_executor runs
+# larger units of work that may themselves submit to page_executor; keeping
+# them separate means a task can never deadlock waiting on its own pool.
+page_workers = int(os.getenv("WORDPRESS_PAGE_WORKERS", "8"))
+task_workers = int(os.getenv("WORDPRESS_TASK_WORKERS", "8"))
+page_executor = ThreadPoolExecutor(max_workers=page_workers, thread_name_prefix="wp-page")
+task_executor = ThreadPoolExecutor(max_workers=task_workers, thread_name_prefix="wp-task")
+
+# Image uploads (download + upload) run on their own pool so a large batch
+# cannot starve crawls of workers
+upload_workers = int(os.getenv("UPLOAD_WORKERS", "6"))
+upload_batch_max = int(os.getenv("UPLOAD_BATCH_MAX", "50"))
+upload_executor = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="wp-upload")
+
+# Bulk publishing through /wp-json/batch/v1 (WordPress allows 25 requests per batch)
+publish_batch_size = int(os.getenv("PUBLISH_BATCH_SIZE", "25"))
+publish_batch_max = int(os.getenv("PUBLISH_BATCH_MAX", "200"))
+
+# Skip page updates identical to the last write from this server, and send
+# only the changed fields when some differ
+page_write_skip_unchanged = os.getenv("PAGE_WRITE_SKIP_UNCHANGED", "true").lower() in ("1", "true", "yes")
+
+# Most ids accepted by one get_wordpress_content_by_ids call
+content_bulk_max = int(os.getenv("CONTENT_BULK_MAX", "200"))
+
+# Media listing page sizes for get_wordpress_image_assets
+media_page_size = int(os.getenv("MEDIA_PAGE_SIZE", "100"))
+media_page_size_max = int(os.getenv("MEDIA_PAGE_SIZE_MAX", "500"))
+
+# Content-hash dedupe of image uploads. src_url images up to
+# MEDIA_DEDUPE_BUFFER_BYTES are hashed before they are uploaded; larger ones
+# are hashed while they stream and recorded once uploaded.
+media_dedupe = os.getenv("MEDIA_DEDUPE", "true").lower() in ("1", "true", "yes")
+media_dedupe_buffer_bytes = int(os.getenv("MEDIA_DEDUPE_BUFFER_BYTES", str(2 * 1024 * 1024)))
+
+# Hash the existing media library in the background on the first upload
+media_hash_seed = os.getenv("MEDIA_HASH_SEED", "true").lower() in ("1", "true", "yes")
+
+# Tool result size limit in bytes of JSON. Override per tool with
+# MCP_MAX_RESULT_BYTES_<TOOL_NAME>, e.g. MCP_MAX_RESULT_BYTES_GET_WORDPRESS_SITE_DETAILS
+max_result_bytes = int(os.getenv("MCP_MAX_RESULT_BYTES", str(4 * 1024 * 1024)))
+
+# Time budget for all WordPress requests of one tool call, in seconds.
+# Override per tool with WORDPRESS_TOOL_DEADLINE_SECONDS_<TOOL_NAME>
+tool_deadline = float(os.getenv("WORDPRESS_TOOL_DEADLINE_SECONDS", "120"))
+
+# Also return results as a structuredContent object (doubles the payload size)
+structured_content = os.getenv("MCP_STRUCTURED_CONTENT", "false").lower() in ("1", "true", "yes")
+
+# Minimum seconds between two progress notifications for one tool call
+progress_interval = float(os.getenv("MCP_PROGRESS_INTERVAL_SECONDS", "0.25"))
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Progress Reporting
+# =============================================================================
+
+class ProgressReporter:
+    """
+    Collects progress for one tool call and forwards it, throttled, to the
+    transport (e.g. as MCP notifications/progress events over SSE).
+
+    Work that knows its size calls add_total(); work calls advance() as it
+    completes. Both are safe to call from any worker thread.
+
+    :param emit: fn(progress, total, message) called with the running totals
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.progress = 0
+        self.total = 0
+        self._lock = threading.Lock()
+        self._last_emit = 0.0
+
+    def add_total(self, amount):
+        with self._lock:
+            self.total += amount
+
+    def advance(self, amount=1, message=None):
+        with self._lock:
+            self.progress += amount
+            now = time.monotonic()
+            done = self.total and self.progress >= self.total
+            if not done and now - self._last_emit < progress_interval:
+                return
+            self._last_emit = now
+            progress, total = self.progress, self.total
+
+        self.emit(progress, total or None, message)
+
+
+_progress = contextvars.ContextVar("mcp_progress", default=None)
+
+
+@contextmanager
+def reporting_progress(reporter):
+    """
+    Route progress from the tool call run inside this block to reporter.
+    """
+    token = _progress.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _progress.reset(token)
+
+
+def progress_total(amount):
+    reporter = _progress.get()
+    if reporter is not None:
+        reporter.add_total(amount)
+
+
+def progress_advance(amount=1, message=None):
+    reporter = _progress.get()
+    if reporter is not None:
+        reporter.advance(amount, message)
+
+
+def tenant():
+    """
+    The tenant of the current request: its WordPress site URL, client (wp)
+    and caches. See tenants.py.
+    """
+    return tenants.current()
+
+
+def submit(executor, fn, *args):
+    """
+    Submit work to an executor, carrying over the caller's context (e.g. the
+    active progress reporter) into the worker thread.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args)
+
+
+# =============================================================================
+# Metrics
+# =============================================================================
+
+_tool_names = None
+
+
+def _metric_labels(method, params):
+    """
+    Method and tool labels for metrics. Names sent by clients are only used
+    when they are known, so label values stay bounded.
+
+    :return: Tuple of (method label, tool label or None)
+    """
+    global _tool_names
+
+    if method not in ("initialize", "tools/list", "tools/call"):
+        return "other", None
+    if method != "tools/call":
+        return method, None
+
+    if _tool_names is None:
+        _tool_names = {tool["name"] for tool in handle_tools_list()["tools"]}
+    tool_name = (params or {}).get("name") if isinstance(params, dict) else None
+    return method, tool_name if tool_name in _tool_names else "unknown"
+
+
+def _sum_stats(stats_list):
+    # Add up numeric stats (nested one level, e.g. limits.read) across tenants
+    total = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                total[key] = _sum_stats([total.get(key, {}), value])
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+def collect_metrics():
+    """
+    Cache and connection pool statistics, read by metrics.render() on each
+    scrape and summed over the active tenants (an evicted tenant's counts
+    go with it).
+    """
+    active = tenants.registry.active()
+    caches = {
+        "inventory": _sum_stats([site.inventory_cache.stats() for site in active]),
+        "content": _sum_stats([site.content_cache.stats() for site in active]),
+        "media_hash": _sum_stats([site.media_hashes.stats() for site in active])
+    }
+    pools = [site.wp.stats() for site in active]
+    pool = _sum_stats(pools)
+    writes = _sum_stats([site.page_writes.stats() for site in active])
+    limits = {budget: pool.get("limits", {}).get(budget, {}) for budget in ("read", "write")}
+
+    return [
+        ("cache_hits_total", "counter", "Cache lookups answered from memory",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("cache_misses_total", "counter", "Cache lookups that went to WordPress",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("cache_entries", "gauge", "Entries held per cache",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("content_cache_revalidations_total", "counter", "Cached content confirmed current with a conditional request",
+         [({}, caches["content"]["revalidations"])]),
+        ("content_cache_bytes", "gauge", "Approximate size of cached content",
+         [({}, caches["content"]["bytes"])]),
+        ("search_index_builds_total", "counter", "Search index (re)builds",
+         [({}, sum(site.search_indexes.builds for site in active))]),
+        ("page_writes_skipped_total", "counter", "Page updates skipped because nothing changed",
+         [({}, writes.get("skipped", 0))]),
+        ("page_writes_partial_total", "counter", "Page updates sent with only the changed fields",
+         [({}, writes.get("partial", 0))]),
+        ("http_pool_hits_total", "counter", "WordPress requests served on an open keep-alive connection",
+         [({}, pool.get("pool_hits", 0))]),
+        ("http_pool_misses_total", "counter", "WordPress requests that opened a new connection",
+         [({}, pool.get("pool_misses", 0))]),
+        ("upstream_circuit_open", "gauge", "Tenants whose WordPress circuit breaker is refusing requests",
+         [({}, sum(1 for stats in pools if stats["breaker"]["state"] != "closed"))]),
+        ("upstream_circuit_opened_total", "counter", "Times a WordPress circuit breaker opened",
+         [({}, pool.get("breaker", {}).get("opened", 0))]),
+        ("upstream_circuit_rejected_total", "counter", "Requests refused while a circuit breaker was open",
+         [({}, pool.get("breaker", {}).get("rejected", 0))]),
+        ("upstream_limiter_in_flight", "gauge", "WordPress requests holding a read/write in-flight slot",
+         [({"budget": name}, stats.get("in_flight", 0)) for name, stats in limits.items()]),
+        ("upstream_limiter_waiting", "gauge", "WordPress requests queued for the read/write rate limiter",
+         [({"budget": name}, stats.get("waiting", 0)) for name, stats in limits.items()]),
+        ("upstream_throttled_total", "counter", "429 responses that paused a read/write budget",
+         [({"budget": name}, stats.get("throttled", 0)) for name, stats in limits.items()]),
+        ("tenants_active", "gauge", "WordPress sites with a loaded client and caches",
+         [({}, len(active))]),
+        ("tenant_evictions_total", "counter", "Tenants unloaded after being idle",
+         [({}, tenants.registry.evictions)])
+    ]
+
+
+metrics.register_collector(collect_metrics)
+
+
 # =============================================================================
 # MCP Protocol Request Routing
 # =============================================================================
@@ -37,15 +288,19 @@ def handle_request(method, params):
       - tools/call
     Notifications (notifications/*) are handled in app.py (204 No Content).
     """
-    if method == "initialize":
-        return handle_initialize()
-    elif method == "tools/list":
-        return handle_tools_list()
-    elif method == "tools/call":
-        return handle_tool_call(params)
-    else:
-        # Let app.py wrap unknown methods into a proper JSON-RPC error
-        raise ValueError(f"Method not found: {method}")
+    method_label, tool_label = _metric_labels(method, params)
+
+    with metrics.track_request(method_label, tool_label):
+        if method == "initialize":
+            return handle_initialize()
+        elif method == "tools/list":
+            return handle_tools_list()
+        elif method == "tools/call":
+            with wp_client.deadline(tool_deadline_seconds(tool_label)):
+                return handle_tool_call(params)
+        else:
+            # Let app.py wrap unknown methods into a proper JSON-RPC error
+            raise ValueError(f"Method not found: {method}")
 
 
 # =============================================================================
@@ -85,7 +340,7 @@ def handle_tools_list():
                     "properties": {
                         "query": {
                             "type": "string", 
-                            "description": "The user query requesting site details for the MCP Connector."
+                            "description": "Optional search terms. When they match page or post titles, slugs or URLs, only the best matches are returned; otherwise the full list is returned."
                         }
                     },
                     "required": [],
@@ -107,12 +362,62 @@ def handle_tools_list():
                             "type": "string", 
                             "enum": ["page", "post"],
                             "description": "The type of WordPress content to retrieve."
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["html", "text", "outline"],
+                            "description": "How to return the content: html (full rendered HTML, default), text (plain text only), or outline (headings, lists and links in compact markdown). text and outline drop scripts, styles and tracking snippets and are much smaller."
+                        },
+                        "fields": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": ["id", "date", "modified", "slug", "status", "type", "link", "title", "content"]},
+                            "description": "Optional list of fields to return. Omit for all fields."
+                        },
+                        "max_bytes": {
+                            "type": "integer",
+                            "description": "Optional maximum size of the returned content in bytes; longer content is cut with a truncation marker."
                         }
                     },
                     "required": ["content_id", "content_type"],
                     "additionalProperties": False
                 }
             },
+            {
+                "name": "get_wordpress_content_by_ids",
+                "description": "Get WordPress content for many pages and blog posts at once by their IDs.",
+                "annotations": {"read_only": False},
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "post_ids": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "Numeric IDs of the blog posts to retrieve."
+                        },
+                        "page_ids": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "Numeric IDs of the pages to retrieve."
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["html", "text", "outline"],
+                            "description": "How to return the content: html (full rendered HTML, default), text (plain text only), or outline (headings, lists and links in compact markdown). text and outline drop scripts, styles and tracking snippets and are much smaller."
+                        },
+                        "fields": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": ["id", "date", "modified", "slug", "status", "type", "link", "title", "content"]},
+                            "description": "Optional list of fields to return. Omit for all fields."
+                        },
+                        "max_bytes": {
+                            "type": "integer",
+                            "description": "Optional maximum size of the returned content in bytes; longer content is cut with a truncation marker."
+                        }
+                    },
+                    "required": [],
+                    "additionalProperties": False
+                }
+            },
             {
                 "name": "publish_new_page_to_wordpress",
                 "description": "Publishes a fully prepared HTML landing page to WordPress, automatically embedding Google Tag Manager and adding validated SEO friendly structured data.",
@@ -146,16 +451,68 @@ def handle_tools_list():
                     "additionalProperties": False
                 }
             },
+            {
+                "name": "publish_pages_to_wordpress",
+                "description": "Publishes or updates many fully prepared HTML pages to WordPress in one call. Returns a result per page in input order, including errors for any that failed.",
+                "annotations": {"read_only": False},
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "pages": {
+                            "type": "array",
+                            "description": "The pages to publish.",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "html": {
+                                        "type": "string",
+                                        "description": "The full HTML content of the landing page to be published."
+                                    },
+                                    "title": {
+                                        "type": "string",
+                                        "description": "The title of the web page that is being published."
+                                    },
+                                    "slug": {
+                                        "type": "string",
+                                        "description": "The page path or seo slug that this html page will be published to. (eg. products/prototypr-ai)"
+                                    },
+                                    "page_id": {
+                                        "type": "string",
+                                        "description": "The id of the page to be updated. If no id is present, please default to New."
+                                    },
+                                    "status": {
+                                        "type": "string",
+                                        "enum": ["publish", "draft"],
+                                        "description": "Set the publish status of a page to publish or draft. "
+                                    }
+                                },
+                                "required": ["html", "title", "slug", "page_id"],
+                                "additionalProperties": False
+                            }
+                        }
+                    },
+                    "required": ["pages"],
+                    "additionalProperties": False
+                }
+            },
             {
                 "name": "get_wordpress_image_assets",
-                "description": "Returns an object of image assets for the WordPress site.",
+                "description": "Returns a page of image assets for the WordPress site, newest first. Pass next_cursor back as cursor to get the next page.",
                 "annotations": {"read_only": False},
                 "inputSchema": {
                     "type": "object",
                     "properties": {
                         "query": {
                             "type": "string", 
-                            "description": "The user query requesting site details for the MCP Connector."
+                            "description": "Optional search terms. When they match image alt text, file names or URLs, only the best matches are returned; otherwise the full library is paged."
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Opaque cursor returned as next_cursor by a previous call. Omit to start from the newest image. Only valid with the same query it was returned for."
+                        },
+                        "page_size": {
+                            "type": "integer",
+                            "description": "Number of images to return per page."
                         }
                     },
                     "required": [],
@@ -194,12 +551,91 @@ def handle_tools_list():
                     "required": ["img_type"],
                     "additionalProperties": False
                 }
+            },
+            {
+                "name": "upload_images_to_wordpress",
+                "description": "Upload several images to WordPress at once, each from either a base64 string or a source URL. Returns a result per image in input order, including errors for any that failed.",
+                "annotations": {"read_only": False},
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "images": {
+                            "type": "array",
+                            "description": "The images to upload.",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "img_type": {
+                                        "type": "string",
+                                        "enum": ["base64", "src_url"],
+                                        "description": "How the image is provided"
+                                    },
+                                    "base64_img": {
+                                        "type": "string",
+                                        "description": "Base64-encoded image data. Required when img_type is 'base64'."
+                                    },
+                                    "img_src": {
+                                        "type": "string",
+                                        "description": "Public URL of an image. Required when img_type is 'src_url'."
+                                    },
+                                    "title": {
+                                        "type": "string",
+                                        "description": "Optional title for the image attachment in WordPress"
+                                    },
+                                    "alt_text": {
+                                        "type": "string",
+                                        "description": "Optional alt text for the image (accessibility and semantic context)."
+                                    }
+                                },
+                                "required": ["img_type"],
+                                "additionalProperties": False
+                            }
+                        }
+                    },
+                    "required": ["images"],
+                    "additionalProperties": False
+                }
             }
         ]
     }
 
 
 
+def tool_max_result_bytes(tool_name):
+    """
+    Result size limit for a tool: MCP_MAX_RESULT_BYTES_<TOOL> or the default.
+    """
+    override = os.getenv(f"MCP_MAX_RESULT_BYTES_{(tool_name or '').upper()}")
+    return int(override) if override else max_result_bytes
+
+
+def tool_deadline_seconds(tool_name):
+    """
+    Deadline for a tool call: WORDPRESS_TOOL_DEADLINE_SECONDS_<TOOL> or the default.
+    """
+    override = os.getenv(f"WORDPRESS_TOOL_DEADLINE_SECONDS_{(tool_name or '').upper()}")
+    return float(override) if override else tool_deadline
+
+
+def tool_result(tool_name, data):
+    """
+    Wrap a tool's return value as an MCP tool result.
+
+    The data is sent as compact JSON text, trimmed to the tool's size limit
+    with truncation markers (see mcp_json.fit), plus a structuredContent
+    copy when MCP_STRUCTURED_CONTENT is enabled.
+    """
+    with tracing.span("encode"):
+        encoded, data = mcp_json.fit(data, tool_max_result_bytes(tool_name))
+    result = {"content": [{"type": "text", "text": encoded.decode("utf-8")}]}
+
+    if structured_content:
+        # structuredContent must be a JSON object
+        result["structuredContent"] = data if isinstance(data, dict) else {"result": data}
+
+    return result
+
+
 def handle_tool_call(params):
     tool_name = params.get("name")
     arguments = params.get("arguments", {})
@@ -216,23 +652,35 @@ def handle_tool_call(params):
 
     if tool_name == "get_wordpress_site_details":
         data = get_all_posts_and_pages(arguments)
-        return {"content": [{"type": "text", "text": str(data)}]}   
+        return tool_result(tool_name, data)
 
     elif tool_name == "get_wordpress_content_by_id":
         data = get_wordpress_content_by_id(arguments)
-        return {"content": [{"type": "text", "text": str(data)}]}   
+        return tool_result(tool_name, data)
     
+    elif tool_name == "get_wordpress_content_by_ids":
+        data = get_wordpress_content_by_ids(arguments)
+        return tool_result(tool_name, data)
+
     elif tool_name == "publish_new_page_to_wordpress":
         data = publish_new_page_to_wordpress(arguments)
-        return {"content": [{"type": "text", "text": str(data)}]} 
+        return tool_result(tool_name, data)
+
+    elif tool_name == "publish_pages_to_wordpress":
+        data = publish_pages_to_wordpress(arguments)
+        return tool_result(tool_name, data)
 
     elif tool_name == "get_wordpress_image_assets":
         data = get_wordpress_image_assets(arguments)
-        return {"content": [{"type": "text", "text": str(data)}]} 
+        return tool_result(tool_name, data)
 
     elif tool_name == "upload_image_to_wordpress":
         data = upload_image_to_wordpress(arguments)
-        return {"content": [{"type": "text", "text": str(data)}]} 
+        return tool_result(tool_name, data)
+
+    elif tool_name == "upload_images_to_wordpress":
+        data = upload_images_to_wordpress(arguments)
+        return tool_result(tool_name, data)
     
     else:
         return {
@@ -246,56 +694,169 @@ def handle_tool_call(params):
 # =============================================================================
 
 
-def fetch_wordpress_items(endpoint, per_page=100):
+def _normalize_item(item):
+    """
+    Normalize a raw post/page object into the site inventory shape.
+    """
+    return {
+        "id": item.get("id"),
+        "title": item.get("title", {}).get("rendered"),
+        "url": item.get("link"),
+        "type": item.get("type"),
+        "date": item.get("date"),
+        "modified": item.get("modified"),
+    }
+
+
+def _fetch_items_page(endpoint, per_page, page_number, params=None):
+    """
+    Fetch a single page of a WordPress collection.
+
+    :param params: Extra query params (e.g. modified_after, orderby, _fields)
+    :return: Tuple of (raw items, response); items are empty when the page is out of bounds
+    """
+    query = {
+        "per_page": per_page,
+        "page": page_number,
+        "_fields": "id,slug,type,link,title,date,modified"
+    }
+    query.update(params or {})
+
+    response = tenant().wp.get(endpoint, params=query)
+
+    # WordPress returns 400 when page exceeds bounds
+    if response.status_code == 400:
+        return [], response
+
+    response.raise_for_status()
+    return response.json() or [], response
+
+
+def fetch_wordpress_items(endpoint, per_page=100, params=None, normalize=_normalize_item):
     """
     Fetch all items from a WordPress REST endpoint.
 
+    The first page is fetched on its own to read X-WP-TotalPages, the
+    remaining pages are then fetched concurrently on the shared page pool.
+    Items are returned in the same order WordPress paginates them.
+
     :param endpoint: Full WordPress REST endpoint URL
     :param per_page: Number of items per request (max 100)
+    :param params: Extra query params passed on every page request
+    :param normalize: Function applied to each raw item
     :return: List of normalized items
     """
-    page_number = 1
-    items = []
+    data, response = _fetch_items_page(endpoint, per_page, 1, params)
+    items = [normalize(item) for item in data]
+
+    if not data:
+        return items
+
+    total_pages = response.headers.get("X-WP-TotalPages")
+
+    progress_total(int(total_pages) if total_pages else 1)
+    progress_advance(1, f"Fetched page 1 of {endpoint}")
+
+    if total_pages is None:
+        # No pagination headers (some proxies strip them): walk serially
+        page_number = 2
+        while len(data) >= per_page:
+            data, _ = _fetch_items_page(endpoint, per_page, page_number, params)
+            items.extend(normalize(item) for item in data)
+            progress_total(1)
+            progress_advance(1, f"Fetched page {page_number} of {endpoint}")
+            page_number += 1
+        return items
+
+    futures = [
+        submit(page_executor, _fetch_items_page, endpoint, per_page, page_number, params)
+        for page_number in range(2, int(total_pages) + 1)
+    ]
+
+    # Collect in submission order so results keep WordPress ordering
+    for page_number, future in enumerate(futures, start=2):
+        data, _ = future.result()
+        items.extend(normalize(item) for item in data)
+        progress_advance(1, f"Fetched page {page_number} of {total_pages} from {endpoint}")
 
-    while True:
-        response = requests.get(
-            endpoint,
-            params={
-                "per_page": per_page,
-                "page": page_number,
-                "_fields": "id,slug,type,link,title,date,modified"
-            }
-        )
+    return items
 
-        # WordPress returns 400 when page exceeds bounds
-        if response.status_code == 400:
-            break
 
-        response.raise_for_status()
-        data = response.json()
+def _modified_after(timestamp):
+    """
+    modified_after is exclusive, so step back one second to also pick up
+    items saved within the same second as the newest one we hold. Duplicates
+    are merged by id in the cache.
+    """
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return timestamp
+    return (parsed - timedelta(seconds=1)).isoformat()
 
-        if not data:
-            break
 
-        for item in data:
-            items.append({
-                "id": item.get("id"),
-                "title": item.get("title", {}).get("rendered"),
-                "url": item.get("link"),
-                "type": item.get("type"),
-                "date": item.get("date"),
-                "modified": item.get("modified"),
-            })
+def get_site_inventory(content_type, per_page=100, params=None, normalize=_normalize_item, id_field="id"):
+    """
+    Return a cached inventory for a WordPress collection, syncing only what changed.
+
+    :param content_type: Collection name, e.g. 'posts', 'pages' or 'media'
+    :param per_page: Number of items per request (max 100)
+    :param params: Extra query params for every request (e.g. media_type, _fields)
+    :param normalize: Function applied to each raw item
+    :param id_field: Name of the id field in the normalized items
+    :return: List of normalized items
+    """
+    site = tenant()
+    endpoint = site.wp.url(f"wp/v2/{content_type}")
+    params = params or {}
+
+    return site.inventory_cache.get(
+        (site.site_url, content_type),
+        fetch_all=lambda: fetch_wordpress_items(endpoint, per_page, params, normalize),
+        fetch_modified_since=lambda timestamp: fetch_wordpress_items(
+            endpoint,
+            per_page,
+            params={
+                **params,
+                "modified_after": _modified_after(timestamp),
+                "orderby": "modified",
+                "order": "asc"
+            },
+            normalize=normalize
+        ),
+        fetch_ids=lambda: [
+            item["id"] for item in fetch_wordpress_items(
+                endpoint, per_page, params={**params, "_fields": "id"}, normalize=lambda item: item
+            )
+        ],
+        id_field=id_field
+    )
 
-        page_number += 1
 
-    return items
+def search_inventory(content_type, items, query, fields, limit=None, scored=False):
+    """
+    Rank an inventory list against a free-text query using the local index.
+
+    :param content_type: Inventory name, used to key the index
+    :param items: Inventory list as returned by get_site_inventory
+    :param query: Free-text query
+    :param fields: Field definitions from wp_search
+    :param limit: Maximum number of matches
+    :param scored: Return (score, item) pairs instead of items
+    :return: List of matching items, best first
+    """
+    index = tenant().search_indexes.get((tenant().site_url, content_type), items, fields)
+    return index.search(query, limit, scored=scored)
 
 
 def get_all_posts_and_pages(arguments):
     """
     Fetch all WordPress posts and pages and return them grouped by type.
 
+    Served from the in-process inventory cache; see get_site_inventory.
+    When a query is given and matches something, only the top ranked
+    matches by title, slug and URL are returned.
+
     :param site_url: Base WordPress URL (e.g. https://example.com)
     :param per_page: Number of items per request (max 100)
     :return: Dict with 'posts' and 'pages' keys
@@ -306,53 +867,36 @@ def get_all_posts_and_pages(arguments):
     # Current Max Limit 
     per_page = 100
 
-    # Wordpress Endpoints
-    posts_endpoint = f"{site_url}/wp-json/wp/v2/posts"
-    pages_endpoint = f"{site_url}/wp-json/wp/v2/pages"
+    # Fetch posts and pages at the same time
+    posts_future = submit(task_executor, get_site_inventory, "posts", per_page)
+    pages = get_site_inventory("pages", per_page)
+    posts = posts_future.result()
 
-    # Fetch wordpress data
-    posts = fetch_wordpress_items(posts_endpoint, per_page)
-    pages = fetch_wordpress_items(pages_endpoint, per_page)
+    if query:
+        matched_posts = search_inventory("posts", posts, query, wp_search.content_fields)
+        matched_pages = search_inventory("pages", pages, query, wp_search.content_fields)
+
+        # Nothing matched (e.g. a conversational query): fall back to the full inventory
+        if matched_posts or matched_pages:
+            return {
+                "domain": tenant().site_url,
+                "query": query,
+                "posts": matched_posts,
+                "pages": matched_pages
+            }
 
     return {
-        "domain": site_url,
+        "domain": tenant().site_url,
         "posts": posts,
         "pages": pages
     }
 
 
 
-def get_wordpress_content_by_id(arguments):
+def _normalize_content(item):
     """
-    Fetch a single WordPress post or page by ID.
-
-    :param site_url: Base WordPress URL (e.g. https://example.com)
-    :param content_id: WordPress ID of the content
-    :param content_type: 'post' or 'page'
-    :return: Normalized content dictionary or None
+    Normalize a raw post/page object into the content-by-id shape.
     """
-
-    content_id = arguments.get("content_id")
-    content_type = arguments.get("content_type")
-
-    if content_type not in ["post", "page"]:
-        raise ValueError("content_type must be 'post' or 'page'")
-
-    endpoint = f"{site_url}/wp-json/wp/v2/{content_type}s/{content_id}"
-
-    response = requests.get(
-        endpoint,
-        params={
-            "_fields": "id,date,modified,slug,status,type,link,title,content"
-        }
-    )
-
-    if response.status_code == 404:
-        return None
-
-    response.raise_for_status()
-    item = response.json()
-
     return {
         "id": item.get("id"),
         "date": item.get("date"),
@@ -362,150 +906,980 @@ def get_wordpress_content_by_id(arguments):
         "type": item.get("type"),
         "link": item.get("link"),
         "title": {
-            "rendered": item.get("title", {}).get("rendered")
+            "rendered": (item.get("title") or {}).get("rendered")
         },
         "content": {
-            "rendered": item.get("content", {}).get("rendered")
+            "rendered": (item.get("content") or {}).get("rendered")
         }
     }
 
 
+def _content_key(content_type, content_id):
+    try:
+        return (content_type, int(content_id))
+    except (TypeError, ValueError):
+        return (content_type, content_id)
 
-def publish_new_page_to_wordpress(arguments):
-    """
-    Fetches the schema for a specific BigQuery table and returns it
-    as a list of dictionaries.
-
-    Args:        
-        table_id (string): ID of the table to get the schema for e.g. "prototypr-ai.llm_brand_visibility.brand_questions_to_monitor"
-
-    def create_wp_page_with_slug(username, app_password, site_url, slug, html_content):
 
-    Returns:
-        schema_list (list): List of dictionaries representing the schema
+def _revalidate_content(endpoint, entry):
     """
+    Check whether a cached content entry is still current.
 
-    slug = arguments.get("slug")
-    html_content = arguments.get("html")
-    title = arguments.get("title")
-    page_id = arguments.get("page_id")
-    status = arguments.get("status")
-
-    if page_id == "New":
-        # WordPress Pages Endpoint
-        endpoint = f"{site_url}/wp-json/wp/v2/pages"
-        method = "POST"
-
-    else:
-        endpoint = f"{site_url}/wp-json/wp/v2/pages/{page_id}"
-        method = "PUT"
-
+    Uses a conditional GET when WordPress gave us validators, otherwise asks
+    only for the item's modified timestamp.
 
-    payload = {
-        "title": title,
-        "slug": slug,
-        "content": html_content,
-        "template": template_id,
-        "status": status
-    }
-
-    if method == "POST":
-        # create a new page
-        response = requests.post(
-            endpoint,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            auth=HTTPBasicAuth(wordpress_username, application_password)
-        )
+    :return: True if the cached entry is still current
+    """
+    if entry.etag or entry.last_modified:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        response = tenant().wp.get(endpoint, params={"_fields": "id,modified"}, headers=headers)
+        if response.status_code == 304:
+            return True
     else:
-        # update an existing page by its id
-        response = requests.put(
-            endpoint,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            auth=HTTPBasicAuth(wordpress_username, application_password)
-        )
+        response = tenant().wp.get(endpoint, params={"_fields": "id,modified"})
 
-    print("STATUS:", response.status_code)
-    print("RAW RESPONSE:", response.text)
+    if not response.ok:
+        return False
 
     try:
-        return response.json()
-    except:
-        return {"error": "Invalid JSON returned"}
+        return response.json().get("modified") == entry.modified
+    except ValueError:
+        return False
 
 
-def get_wordpress_image_assets(arguments):
+content_fields = ("id", "date", "modified", "slug", "status", "type", "link", "title", "content")
 
+
+def shape_content(item, arguments):
     """
-    # Build the WordPress REST API endpoint for image media items
-    # media_type=image ensures only images are returned
-    # per_page=100 is the maximum number WordPress allows per request
+    Apply the optional output controls of the content tools to a normalized item.
+
+    :param format: 'html' (default, content.rendered as stored), 'text' (plain
+                   text) or 'outline' (headings, lists and links in markdown style)
+    :param fields: Optional list of fields to return (see content_fields)
+    :param max_bytes: Optional cap on the size of the returned content
+    :return: A new dict; the cached item is never modified
     """
+    if item is None:
+        return None
 
-    query = arguments.get("query")
+    output_format = arguments.get("format") or "html"
+    fields = arguments.get("fields")
+    max_bytes = arguments.get("max_bytes")
 
-    endpoint = f"{site_url}/wp-json/wp/v2/media?media_type=image&per_page=100"
+    if output_format not in ("html",) + html_outline.formats:
+        raise ValueError(f"format must be one of: html, {', '.join(html_outline.formats)}")
 
-    # Make the HTTP GET request to WordPress
-    response = requests.get(endpoint)
+    if fields:
+        unknown = [field for field in fields if field not in content_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        shaped = {field: item.get(field) for field in fields}
+    else:
+        shaped = dict(item)
 
-    # If the request fails, log the error and return an empty list
-    if response.status_code != 200:
-        print("Error:", response.text)
-        return []
+    if "content" in shaped:
+        html = (item.get("content") or {}).get("rendered") or ""
+        text = html if output_format == "html" else html_outline.reduce_html(html, output_format)
 
-    # Parse the JSON response into Python objects
-    media_items = response.json()
+        if max_bytes and len(text.encode("utf-8")) > max_bytes:
+            kept = text.encode("utf-8")[:int(max_bytes)].decode("utf-8", errors="ignore")
+            text = kept + mcp_json.truncation_marker.format(omitted=len(text) - len(kept))
 
-    # Prepare a list to hold normalized image asset data
-    results = []
+        key = "rendered" if output_format == "html" else output_format
+        shaped["content"] = {key: text}
 
-    # Iterate over each media item returned by WordPress
-    for item in media_items:
-        # Unique WordPress ID for the image
-        img_id = item.get("id")
+    return shaped
 
-        # Date the image was uploaded
-        timestamp = item.get("date")
 
-        # Public URL to the image file
-        src = item.get("source_url")
+def get_wordpress_content_by_id(arguments):
+    """
+    Fetch a single WordPress post or page by ID.
 
-        # Alternative text for accessibility (may be empty)
-        alt = item.get("alt_text", "")
+    Reads through content_cache: a recently validated entry, or one whose
+    modified timestamp matches a fresh site inventory, is returned without a
+    request. Older entries are revalidated with a small conditional request
+    before falling back to a full fetch.
 
-        # File path/name as stored by WordPress
-        file_name = item.get("media_details", {}).get("file", "")
+    :param site_url: Base WordPress URL (e.g. https://example.com)
+    :param content_id: WordPress ID of the content
+    :param content_type: 'post' or 'page'
+    :param format, fields, max_bytes: Optional output controls, see shape_content
+    :return: Normalized content dictionary or None
+    """
+    site = tenant()
+
+    content_id = arguments.get("content_id")
+    content_type = arguments.get("content_type")
+
+    if content_type not in ["post", "page"]:
+        raise ValueError("content_type must be 'post' or 'page'")
+
+    endpoint = site.wp.url(f"wp/v2/{content_type}s/{content_id}")
+    key = _content_key(content_type, content_id)
+
+    entry = site.content_cache.get(key)
+    if entry is not None:
+        if _cached_content(content_type, key) is not None:
+            site.content_cache.count("hits")
+            return shape_content(entry.value, arguments)
+
+        if _revalidate_content(endpoint, entry):
+            site.content_cache.count("revalidations")
+            site.content_cache.touch(entry)
+            return shape_content(entry.value, arguments)
+
+    site.content_cache.count("misses")
+
+    response = site.wp.get(
+        endpoint,
+        params={
+            "_fields": "id,date,modified,slug,status,type,link,title,content"
+        }
+    )
+
+    if response.status_code == 404:
+        site.content_cache.invalidate(key)
+        return None
+
+    response.raise_for_status()
+    item = _normalize_content(response.json())
+
+    site.content_cache.put(
+        key,
+        item,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified")
+    )
+
+    return shape_content(item, arguments)
+
+
+
+def _cached_content(content_type, key):
+    """
+    Return a cached content item that is safe to serve without a request:
+    recently validated, or matching the modified timestamp of a fresh inventory.
+    """
+    site = tenant()
+    entry = site.content_cache.get(key)
+    if entry is None:
+        return None
+
+    known = site.inventory_cache.peek((site.site_url, f"{content_type}s"), key[1])
+    if entry.is_fresh(site.content_cache.fresh_seconds) or (known and known.get("modified") == entry.modified):
+        return entry
+
+    return None
+
+
+def _fetch_content_chunk(content_type, ids):
+    """
+    Fetch up to 100 posts or pages in one request using include=.
+
+    :return: Dict of id -> normalized content item
+    """
+    site = tenant()
+    response = site.wp.get(
+        site.wp.url(f"wp/v2/{content_type}s"),
+        params={
+            "include": ",".join(str(content_id) for content_id in ids),
+            "per_page": 100,
+            "_fields": "id,date,modified,slug,status,type,link,title,content"
+        }
+    )
+    response.raise_for_status()
+
+    found = {}
+    for raw in response.json():
+        item = _normalize_content(raw)
+        site.content_cache.put(_content_key(content_type, item["id"]), item)
+        found[item["id"]] = item
+    return found
+
+
+def get_wordpress_content_by_ids(arguments):
+    """
+    Fetch many WordPress posts and pages by ID in as few requests as possible.
+
+    Ids already fresh in content_cache are served from memory, the rest are
+    fetched 100 at a time with the REST include= filter, concurrently.
+
+    :param post_ids: List of post ids
+    :param page_ids: List of page ids
+    :param format, fields, max_bytes: Optional output controls, see shape_content
+    :return: Dict with 'posts' and 'pages' (normalized like get_wordpress_content_by_id,
+             in request order) and 'not_found' ids per type
+    """
+
+    requested = {
+        "post": arguments.get("post_ids") or [],
+        "page": arguments.get("page_ids") or []
+    }
+
+    if sum(len(ids) for ids in requested.values()) > content_bulk_max:
+        raise ValueError(f"At most {content_bulk_max} ids can be fetched per call")
+
+    found = {"post": {}, "page": {}}
+    futures = []
+
+    for content_type, ids in requested.items():
+        keys = [_content_key(content_type, content_id) for content_id in dict.fromkeys(ids)]
+        cached = tenant().content_cache.get_many(keys, lambda key: _cached_content(content_type, key))
+        missing = []
+        for key in keys:
+            if key in cached:
+                found[content_type][key[1]] = cached[key].value
+            else:
+                missing.append(key[1])
+
+        for i in range(0, len(missing), 100):
+            futures.append((content_type, submit(page_executor, _fetch_content_chunk, content_type, missing[i:i + 100])))
+
+    for content_type, future in futures:
+        found[content_type].update(future.result())
+
+    result = {"posts": [], "pages": [], "not_found": {"posts": [], "pages": []}}
+
+    for content_type, ids in requested.items():
+        for content_id in dict.fromkeys(ids):
+            key = _content_key(content_type, content_id)
+            item = found[content_type].get(key[1])
+            if item is None:
+                result["not_found"][f"{content_type}s"].append(content_id)
+            else:
+                result[f"{content_type}s"].append(shape_content(item, arguments))
+
+    return result
+
+
+
+def publish_new_page_to_wordpress(arguments):
+    """
+    Fetches the schema for a specific BigQuery table and returns it
+    as a list of dictionaries.
+
+    Args:        
+        table_id (string): ID of the table to get the schema for e.g. "prototypr-ai.llm_brand_visibility.brand_questions_to_monitor"
+
+    def create_wp_page_with_slug(username, app_password, site_url, slug, html_content):
+
+    Returns:
+        schema_list (list): List of dictionaries representing the schema
+    """
+    site = tenant()
+
+    page_id = arguments.get("page_id")
+    method, path, payload = _page_write_request(arguments)
+    endpoint = site.wp.url(path)
+
+    if not payload:
+        # Same content as the last write: no revision, no cache purge
+        return _unchanged_page(page_id)
+
+    if method == "POST":
+        # create a new page
+        response = site.wp.post(
+            endpoint,
+            json=payload,
+            headers={"Content-Type": "application/json"}
+        )
+    else:
+        # update an existing page by its id
+        response = site.wp.put(
+            endpoint,
+            json=payload,
+            headers={"Content-Type": "application/json"}
+        )
+
+    logger.info("Page write: %s %s -> %s", method, path, response.status_code)
+    if not response.ok or logger.isEnabledFor(logging.DEBUG):
+        logger.log(
+            logging.WARNING if not response.ok else logging.DEBUG,
+            "Page write response: %s",
+            mcp_logging.Preview(response.text)
+        )
+
+    try:
+        written = response.json()
+    except ValueError:
+        written = None
+
+    if response.ok:
+        _record_page_write(page_id, written, payload)
+
+    if written is None:
+        return {"error": "Invalid JSON returned"}
+    return written
+
+
+def _page_write_request(arguments):
+    """
+    Build the REST request for a publish_new_page_to_wordpress payload.
+
+    Updates carry only the fields that changed since this server last wrote
+    the page; the payload is empty when nothing changed.
+
+    :return: Tuple of (method, path relative to /wp-json/, JSON payload)
+    """
+    slug = arguments.get("slug")
+    html_content = arguments.get("html")
+    title = arguments.get("title")
+    page_id = arguments.get("page_id")
+    status = arguments.get("status")
+
+    if page_id == "New":
+        # WordPress Pages Endpoint
+        path = "wp/v2/pages"
+        method = "POST"
+
+    else:
+        path = f"wp/v2/pages/{page_id}"
+        method = "PUT"
+
+    payload = {
+        "title": title,
+        "slug": slug,
+        "content": html_content,
+        "template": template_id,
+        "status": status
+    }
+
+    if method == "PUT" and page_write_skip_unchanged:
+        payload = _changed_page_fields(page_id, payload)
+
+    return method, path, payload
 
+
+def _changed_page_fields(page_id, payload):
+    """
+    Reduce an update payload to the fields that differ from the last write.
+
+    The full payload is kept when there is no record of a recent write, or
+    when WordPress reports a different `modified` time than our write
+    produced (the page was edited somewhere else since). That time is read
+    with one small request before anything is skipped.
+    """
+    site = tenant()
+    key = _content_key("page", page_id)
+    last_write = site.page_writes.get(key)
+    if last_write is None or not last_write.modified:
+        return payload
+
+    if _page_modified(page_id) != last_write.modified:
+        site.page_writes.invalidate(key)
+        return payload
+
+    changed = site.page_writes.changed_fields(key, payload)
+    if changed is None:
+        return payload
+
+    if not changed:
+        site.page_writes.skipped += 1
+    elif len(changed) < len(payload):
+        site.page_writes.partial += 1
+
+    return {name: payload[name] for name in changed}
+
+
+def _page_modified(page_id):
+    """
+    The `modified` time WordPress currently reports for a page, or None if
+    it could not be read.
+    """
+    site = tenant()
+    try:
+        response = site.wp.get(
+            site.wp.url(f"wp/v2/pages/{page_id}"),
+            authenticated=True,
+            params={"_fields": "id,modified"}
+        )
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    try:
+        return response.json().get("modified")
+    except ValueError:
+        return None
+
+
+def _last_page_summary(page_id):
+    last_write = tenant().page_writes.get(_content_key("page", page_id))
+    if last_write is not None and last_write.summary:
+        return last_write.summary
+    return {"id": page_id}
+
+
+def _unchanged_page(page_id):
+    """
+    Result for an update that was skipped because nothing changed.
+    """
+    return dict(_last_page_summary(page_id), unchanged=True)
+
+
+def _record_page_write(page_id, written, payload=None):
+    """
+    Bring the caches up to date after a successful page write.
+
+    :param page_id: The page_id argument of the write ("New" for creates)
+    :param written: Page object WordPress returned, if any
+    :param payload: The fields that were sent, remembered to skip repeats
+    """
+    site = tenant()
+    # Pick up the new/updated page on the next inventory read
+    site.inventory_cache.invalidate((site.site_url, "pages"))
+
+    # The write response is the full page object, so refresh the content
+    # cache from it instead of forcing the next read to refetch
+    if isinstance(written, dict) and written.get("id") is not None:
+        if isinstance(written.get("content"), dict) and "rendered" in written["content"]:
+            site.content_cache.put(_content_key("page", written["id"]), _normalize_content(written))
+        else:
+            site.content_cache.invalidate(_content_key("page", written["id"]))
+    elif page_id != "New":
+        site.content_cache.invalidate(_content_key("page", page_id))
+
+    written_id = written.get("id") if isinstance(written, dict) else None
+    if written_id is None and page_id != "New":
+        written_id = page_id
+    if payload and written_id is not None:
+        site.page_writes.record(
+            _content_key("page", written_id),
+            payload,
+            modified=written.get("modified") if isinstance(written, dict) else None,
+            summary=_page_summary(written) if isinstance(written, dict) else None
+        )
+
+
+def _page_summary(written):
+    """
+    Compact description of a written page for bulk publish results.
+    """
+    written = written or {}
+    return {
+        "id": written.get("id"),
+        "slug": written.get("slug"),
+        "status": written.get("status"),
+        "link": written.get("link"),
+        "title": (written.get("title") or {}).get("rendered")
+    }
+
+
+def _publish_result(index, status_code, body):
+    """
+    Per-page result for publish_pages_to_wordpress.
+    """
+    if 200 <= status_code < 300:
+        return {"index": index, "ok": True, "status": status_code, "page": _page_summary(body)}
+
+    message = body.get("message") if isinstance(body, dict) else None
+    return {"index": index, "ok": False, "status": status_code, "error": message or str(body)}
+
+
+def _unchanged_publish_result(index, page_id):
+    return {"index": index, "ok": True, "status": None, "unchanged": True, "page": _last_page_summary(page_id)}
+
+
+def _failed_publish_result(index, error):
+    return {"index": index, "ok": False, "status": None, "error": str(error) or type(error).__name__}
+
+
+def _plan_page_writes(chunk):
+    """
+    Build the page write requests for a chunk, once.
+
+    :param chunk: List of (index, arguments) tuples
+    :return: (results, writes): results for pages that need no write, keyed
+             by index, and (index, arguments, method, path, payload) tuples
+    """
+    results = {}
+    writes = []
+    for index, arguments in chunk:
+        method, path, payload = _page_write_request(arguments)
+        if not payload:
+            results[index] = _unchanged_publish_result(index, arguments.get("page_id"))
+            continue
+        writes.append((index, arguments, method, path, payload))
+    return results, writes
+
+
+def _publish_batch_chunk(chunk):
+    """
+    Submit one chunk of page writes through /wp-json/batch/v1.
+
+    :param chunk: List of (index, arguments) tuples
+    :return: (results, writes): per-page results in chunk order, or None when
+             the batch API is unavailable, and the planned writes so the
+             fallback can send them without building them again
+    """
+    results, writes = _plan_page_writes(chunk)
+    if not writes:
+        return [results[index] for index, _ in chunk], writes
+
+    response = tenant().wp.post(
+        tenant().wp.url("batch/v1"),
+        json={
+            "validation": "normal",
+            "requests": [
+                {"method": method, "path": f"/{path}", "body": payload}
+                for _, _, method, path, payload in writes
+            ]
+        },
+        headers={"Content-Type": "application/json"}
+    )
+
+    # Sites older than WordPress 5.6, or with the endpoint disabled
+    if response.status_code in (404, 405):
+        return None, writes
+
+    response.raise_for_status()
+    responses = response.json().get("responses") or []
+
+    for position, (index, arguments, _, _, payload) in enumerate(writes):
+        if position >= len(responses):
+            results[index] = {"index": index, "ok": False, "status": None, "error": "No response in batch"}
+            continue
+
+        entry = responses[position]
+        body = entry.get("body")
+        status_code = entry.get("status") or 500
+
+        if 200 <= status_code < 300:
+            _record_page_write(arguments.get("page_id"), body, payload)
+
+        results[index] = _publish_result(index, status_code, body)
+
+    return [results[index] for index, _ in chunk], writes
+
+
+def _send_page_write(index, arguments, method, path, payload):
+    """
+    Send one planned page write with its own pooled request.
+    """
+    response = tenant().wp.request(
+        method,
+        tenant().wp.url(path),
+        authenticated=True,
+        json=payload,
+        headers={"Content-Type": "application/json"}
+    )
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"message": "Invalid JSON returned"}
+
+    if response.ok:
+        _record_page_write(arguments.get("page_id"), body, payload)
+
+    return _publish_result(index, response.status_code, body)
+
+
+def _publish_single(index, arguments):
+    """
+    Fallback for publish_pages_to_wordpress: one pooled request per page.
+    """
+    results, writes = _plan_page_writes([(index, arguments)])
+    if not writes:
+        return results[index]
+    return _send_page_write(*writes[0])
+
+
+def _single_results(futures):
+    # Results of (index, future) pairs as they complete in order; a page
+    # whose request failed is reported as failed without losing the others
+    for index, future in futures:
+        try:
+            yield future.result()
+        except Exception as e:
+            yield _failed_publish_result(index, e)
+
+
+def publish_pages_to_wordpress(arguments):
+    """
+    MCP tool: create or update many pages in one call.
+
+    Pages are sent through the WordPress batch REST API (/wp-json/batch/v1)
+    in chunks of PUBLISH_BATCH_SIZE, with chunks submitted concurrently. If
+    the site does not support batch requests, each page is published with
+    its own request on the shared page pool instead.
+
+    A chunk or page whose request fails (timeout, open circuit, HTTP error)
+    is reported as failed in the results; pages written by the other chunks
+    are still returned, so a retry can skip them.
+
+    :param pages: List of objects with the publish_new_page_to_wordpress fields
+    :return: Dict with per-page results (in input order) and success/failure counts
+    """
+    site = tenant()
+    pages = arguments.get("pages") or []
+
+    if not isinstance(pages, list):
+        raise ValueError("pages must be a list of page objects")
+
+    if len(pages) > publish_batch_max:
+        raise ValueError(f"At most {publish_batch_max} pages can be published per call")
+
+    indexed = list(enumerate(pages))
+    results = []
+    progress_total(len(pages))
+
+    if site.batch_api_available:
+        chunks = [indexed[i:i + publish_batch_size] for i in range(0, len(indexed), publish_batch_size)]
+        futures = [(chunk, submit(page_executor, _publish_batch_chunk, chunk)) for chunk in chunks]
+
+        for chunk, future in futures:
+            try:
+                chunk_results, writes = future.result()
+            except Exception as e:
+                chunk_results = [_failed_publish_result(index, e) for index, _ in chunk]
+
+            if chunk_results is None:
+                site.batch_api_available = False
+                # Send the writes already planned one by one; pages that
+                # needed no write are reported unchanged
+                sent = {result["index"]: result for result in _single_results([
+                    (write[0], submit(page_executor, _send_page_write, *write)) for write in writes
+                ])}
+                chunk_results = [
+                    sent.get(index) or _unchanged_publish_result(index, page.get("page_id"))
+                    for index, page in chunk
+                ]
+            results.extend(chunk_results)
+            progress_advance(len(chunk), f"Published {len(results)} of {len(pages)} pages")
+    else:
+        futures = [(index, submit(page_executor, _publish_single, index, page)) for index, page in indexed]
+        for result in _single_results(futures):
+            results.append(result)
+            progress_advance(1, f"Published {len(results)} of {len(pages)} pages")
+
+    succeeded = sum(1 for result in results if result["ok"])
+
+    return {
+        "published": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+def _normalize_media(item):
+    """
+    Normalize a raw media object into the image asset shape.
+    """
+    media_details = item.get("media_details") or {}
+
+    return {
+        # Unique WordPress ID for the image
+        "img_id": item.get("id"),
+        # Date the image was uploaded / last edited
+        "date": item.get("date"),
+        "modified": item.get("modified"),
+        # Public URL to the image file
+        "src": item.get("source_url"),
+        # File path/name as stored by WordPress
+        "file_name": media_details.get("file", ""),
+        # Alternative text for accessibility (may be empty)
+        "alt": item.get("alt_text", ""),
         # Original image dimensions
-        dimensions = {
-            "width": item.get("media_details", {}).get("width"),
-            "height": item.get("media_details", {}).get("height")
+        "dimensions": {
+            "width": media_details.get("width"),
+            "height": media_details.get("height")
         }
+    }
+
+
+def _query_digest(query):
+    return hashlib.sha256((query or "").strip().encode("utf-8")).hexdigest()[:16]
+
+
+def _media_sort_key(score, image):
+    # Position in get_wordpress_image_assets order (descending): search
+    # score, then newest first as in the inventory
+    return (score, image.get("date") or "", image.get("img_id") or 0)
+
+
+def _encode_cursor(key, query):
+    """
+    Cursor pointing just past the image with sort key `key`.
+
+    It holds that key rather than an offset, so uploads and deletions
+    between calls neither repeat nor skip images, and it is tied to the
+    query it was issued for.
+    """
+    payload = {"after": list(key), "q": _query_digest(query)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
 
-        # Append the normalized image object to the results list
-        results.append({
-            "img_id": img_id,
-            "date": timestamp,
-            "src": src,
-            "file_name": file_name,
-            "alt": alt,
-            "dimensions": dimensions
-        })
 
-    # Return the full list of image assets
-    return results
+def _decode_cursor(cursor, query):
+    """
+    :return: Sort key to continue after, or None to start from the top
+    :raises ValueError: The cursor is malformed or belongs to another query
+    """
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        score, date, img_id = payload["after"]
+        digest = payload["q"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(score, (int, float)) or not isinstance(date, str) or not isinstance(img_id, int):
+        raise ValueError("Invalid cursor")
+    if digest != _query_digest(query):
+        raise ValueError("Cursor was issued for a different query; start again without a cursor")
+    return (score, date, img_id)
+
+
+def get_media_inventory():
+    """
+    Return the cached list of every image in the media library, newest first.
+
+    The first call enumerates the whole library with concurrent page fetches,
+    later calls are served from memory or delta synced like posts and pages.
+    """
+    return get_site_inventory(
+        "media",
+        per_page=100,
+        params={
+            "media_type": "image",
+            "_fields": "id,date,modified,source_url,alt_text,media_details.file,media_details.width,media_details.height"
+        },
+        normalize=_normalize_media,
+        id_field="img_id"
+    )
+
+
+def get_wordpress_image_assets(arguments):
+
+    """
+    Return one page of image assets from the full media library.
+
+    Results are paged with an opaque cursor so a single tool call never has to
+    ship the whole library: pass the returned next_cursor back in to get the
+    next page. next_cursor is None on the last page. The cursor marks the
+    last image returned, so images added or deleted in the meantime do not
+    shift the next page, and it only works with the query it came from.
+
+    :param query: Optional search terms matched against alt text, file name and URL
+    :param cursor: Opaque cursor from a previous call (optional)
+    :param page_size: Number of images per page (default MEDIA_PAGE_SIZE)
+    :return: Dict with total, images and next_cursor
+    """
+
+    query = arguments.get("query")
+
+    after = _decode_cursor(arguments.get("cursor"), query)
+    page_size = arguments.get("page_size") or media_page_size
+    page_size = max(1, min(int(page_size), media_page_size_max))
+
+    inventory = get_media_inventory()
+    media = [(0, image) for image in inventory]
+
+    if query:
+        # Rank by alt text, file name and URL; no match returns the full library
+        matches = search_inventory("media", inventory, query, wp_search.media_fields, scored=True)
+        if matches:
+            media = matches
+
+    # The list is in descending key order, so the page starts at the first
+    # image sorting after the cursor's
+    keys = [_media_sort_key(score, image) for score, image in media]
+    start = 0
+    if after is not None:
+        start = next((position for position, key in enumerate(keys) if key < after), len(keys))
+
+    end = start + page_size
+    images = [image for _, image in media[start:end]]
+
+    return {
+        "total": len(media),
+        "images": images,
+        "next_cursor": _encode_cursor(keys[end - 1], query) if end < len(media) else None
+    }
+
+
+def _deduplicated_asset(asset):
+    return dict(asset, deduplicated=True)
+
+
+def _live_media_asset(asset):
+    """
+    Check that a media hash index hit still exists in the library.
+
+    A fresh media inventory answers for ids it holds; otherwise one small
+    request asks WordPress. Entries for deleted attachments are dropped.
+
+    :return: The asset, or None if the attachment is gone
+    """
+    if asset is None:
+        return None
+    site = tenant()
+    media_id = asset.get("id")
+    if site.inventory_cache.peek((site.site_url, "media"), media_id) is not None:
+        return asset
+
+    try:
+        response = site.wp.get(
+            site.wp.url(f"wp/v2/media/{media_id}"),
+            authenticated=True,
+            params={"_fields": "id"}
+        )
+    except requests.RequestException:
+        # Cannot tell; the upload that would replace it needs WordPress too
+        return asset
+
+    if response.status_code in (404, 410):
+        site.media_hashes.discard(media_id)
+        site.media_hashes.save_soon()
+        return None
+    return asset
+
+
+def _media_asset(image):
+    """
+    Convert a media inventory item into the upload result shape.
+    """
+    return {
+        "id": image.get("img_id"),
+        "date": image.get("date"),
+        "src": image.get("src"),
+        "file_name": image.get("file_name"),
+        "title": None,
+        "alt_text": image.get("alt"),
+        "dimensions": image.get("dimensions")
+    }
+
+
+def _hash_media_source(src):
+    """
+    Download an image from the library and return the sha256 of its bytes.
+    """
+    response = tenant().wp.get(src, stream=True, timeout=(wp_client.connect_timeout, 30))
+    try:
+        response.raise_for_status()
+        digest = hashlib.sha256()
+        for _ in wp_client.StreamingBody(response, digest=digest):
+            pass
+        return digest.hexdigest()
+    finally:
+        response.close()
+
+
+def seed_media_hashes():
+    """
+    Hash every image in the media library that the hash index does not know
+    yet, and drop index entries for images that have since been deleted.
+
+    Images are downloaded one at a time so seeding never competes with tool
+    calls for connections. The index is saved on the debounce timer as it
+    grows and once more at the end.
+
+    :return: Number of images hashed
+    """
+    media_hashes = tenant().media_hashes
+    media = get_media_inventory()
+    media_hashes.prune({image.get("img_id") for image in media})
+
+    known = media_hashes.ids()
+    hashed = 0
+
+    for image in media:
+        if image.get("img_id") in known or not image.get("src"):
+            continue
+        try:
+            digest = _hash_media_source(image["src"])
+        except Exception as e:
+            logger.info("Skipping media %s while seeding hashes: %s", image.get("img_id"), e)
+            continue
+
+        media_hashes.add(digest, _media_asset(image))
+        hashed += 1
+        media_hashes.save_soon()
+
+    media_hashes.save()
+    return hashed
+
+
+def _run_media_hash_seed(site):
+    try:
+        with tenants.activate(site):
+            hashed = seed_media_hashes()
+        logger.info("Media hash index seeded: %d images hashed", hashed)
+    except Exception:
+        logger.exception("Seeding the media hash index failed")
+
+
+def start_media_hash_seed():
+    """
+    Start seeding the current tenant's media hash index on a background
+    thread, once per tenant.
+    """
+    if not media_hash_seed:
+        return
+    site = tenant()
+    with site.media_seed_lock:
+        if site.media_seed_started:
+            return
+        site.media_seed_started = True
+
+    # The thread starts from an empty context with only the tenant set: the
+    # tool call's deadline, progress reporter and trace must not follow it
+    threading.Thread(
+        target=contextvars.Context().run,
+        args=(_run_media_hash_seed, site),
+        name="wp-media-seed",
+        daemon=True
+    ).start()
+
+
+def _decode_base64_image(base64_img):
+    """
+    Decode a base64 image string into bytes in a single pass.
+
+    binascii reads ASCII str input in place, so unlike base64.b64decode no
+    intermediate bytes copy of the (33% larger) encoded string is made.
+    A leading data URI prefix (data:image/png;base64,) is tolerated.
+    """
+    if base64_img.startswith("data:"):
+        base64_img = base64_img[base64_img.find(",") + 1:]
+
+    # Reject oversized input before spending memory on decoding it
+    if len(base64_img) // 4 * 3 > wp_client.upload_max_bytes:
+        raise ValueError(
+            f"Image is larger than the {wp_client.upload_max_bytes} byte upload limit"
+        )
+
+    try:
+        image_bytes = binascii.a2b_base64(base64_img)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+
+    if not image_bytes:
+        raise ValueError("Decoded image bytes are empty")
+
+    return image_bytes
 
 
 def upload_image_to_wordpress(arguments):
     
     """
     MCP tool: upload an image to WordPress from base64 or src_url.
-    """
 
-    username = wordpress_username
-    app_password = application_password
+    src_url images are streamed from the source straight into the WordPress
+    media POST in UPLOAD_CHUNK_SIZE chunks, so peak memory per upload stays
+    bounded regardless of image size. base64 images are decoded once.
+
+    Images whose bytes are already in the media library are not uploaded
+    again: the existing asset is
+    returned with "deduplicated": true.
+    """
+    site = tenant()
 
     img_type = arguments.get("img_type")
     base64_img = arguments.get("base64_img")
@@ -513,29 +1887,73 @@ def upload_image_to_wordpress(arguments):
     title = arguments.get("title")
     alt_text = arguments.get("alt_text")
 
-    endpoint = f"{site_url}/wp-json/wp/v2/media"
+    endpoint = site.wp.url("wp/v2/media")
+
+    source = None
+    spooled = None
+    content_type = None
+    digest = hashlib.sha256()
+
+    if media_dedupe:
+        start_media_hash_seed()
 
     # -----------------------------------
-    # Normalize input → base64
+    # Normalize input → request body
     # -----------------------------------
     if img_type == "src_url":
         if not img_src:
             raise ValueError("img_src is required when img_type='src_url'")
 
-        response = requests.get(
+        source = site.wp.get(
             img_src,
             timeout=30,
-            headers={"User-Agent": "prototypr.ai"}
+            headers={"User-Agent": "prototypr.ai"},
+            stream=True
         )
-        response.raise_for_status()
+        source.raise_for_status()
 
-        content_type = response.headers.get("Content-Type", "")
+        content_type = source.headers.get("Content-Type", "")
         if not content_type.startswith("image/"):
+            source.close()
             raise ValueError(
                 f"URL did not return an image. Content-Type={content_type}"
             )
 
-        base64_img = base64.b64encode(response.content).decode("utf-8")
+        try:
+            body = wp_client.StreamingBody(source, on_read=progress_advance, digest=digest)
+        except ValueError:
+            source.close()
+            raise
+
+        # Size is only known up front when the source sent a plain
+        # Content-Length; otherwise spool the image so the upload still
+        # carries one (chunked bodies reach many PHP setups empty)
+        if hasattr(body, "len"):
+            progress_total(body.len)
+        else:
+            try:
+                body = spooled = wp_client.spool(body)
+            finally:
+                source.close()
+            source = None
+            progress_total(body.len)
+
+        # Small images are cheap to hold in memory, so read them fully;
+        # spooled ones are already read. Either way check the hash before
+        # uploading anything
+        if media_dedupe and source is not None and 0 < body.len <= media_dedupe_buffer_bytes:
+            try:
+                body = b"".join(body)
+            finally:
+                source.close()
+            source = None
+
+        if media_dedupe and source is None:
+            existing = _live_media_asset(site.media_hashes.get(digest.hexdigest()))
+            if existing is not None:
+                if spooled is not None:
+                    spooled.close()
+                return _deduplicated_asset(existing)
 
         parsed = urlparse(img_src)
         filename = os.path.basename(parsed.path)
@@ -553,7 +1971,21 @@ def upload_image_to_wordpress(arguments):
         if not base64_img:
             raise ValueError("base64_img is required when img_type='base64'")
 
-        filename = f"upload-{uuid.uuid4().hex}.png"
+        # -----------------------------------
+        # Decode base64 → raw bytes
+        # -----------------------------------
+        body = _decode_base64_image(base64_img)
+        digest.update(body)
+
+        if media_dedupe:
+            existing = _live_media_asset(site.media_hashes.get(digest.hexdigest()))
+            if existing is not None:
+                return _deduplicated_asset(existing)
+
+        progress_total(len(body))
+
+        # Name the file after its content so re-uploads are recognisable
+        filename = f"upload-{digest.hexdigest()[:16]}.png"
 
         if not title:
             title = "Uploaded image"
@@ -564,17 +1996,12 @@ def upload_image_to_wordpress(arguments):
     else:
         raise ValueError("img_type must be 'base64' or 'src_url'")
 
-    # -----------------------------------
-    # Decode base64 → raw bytes
-    # -----------------------------------
-    image_bytes = base64.b64decode(base64_img)
-    if not image_bytes:
-        raise ValueError("Decoded image bytes are empty")
-
     # -----------------------------------
     # Detect mime type
     # -----------------------------------
     mime_type, _ = mimetypes.guess_type(filename)
+    if not mime_type and content_type:
+        mime_type = content_type.split(";")[0].strip()
     mime_type = mime_type or "application/octet-stream"
 
     headers = {
@@ -585,13 +2012,24 @@ def upload_image_to_wordpress(arguments):
     # -----------------------------------
     # Upload to WordPress
     # -----------------------------------
-    wp_response = requests.post(
-        endpoint,
-        headers=headers,
-        data=image_bytes,
-        auth=(username, app_password),
-        timeout=30
-    )
+    # title and alt_text ride along as query params, which the media
+    # endpoint applies when it creates the attachment
+    try:
+        wp_response = site.wp.post(
+            endpoint,
+            headers=headers,
+            params={"title": title, "alt_text": alt_text},
+            data=body,
+            timeout=(wp_client.connect_timeout, 30)
+        )
+    finally:
+        if source is not None:
+            source.close()
+        if spooled is not None:
+            spooled.close()
+
+    if img_type == "base64":
+        progress_advance(len(body), f"Uploaded {filename}")
 
     if wp_response.status_code not in [200, 201]:
         raise RuntimeError(
@@ -604,25 +2042,29 @@ def upload_image_to_wordpress(arguments):
 
     media_id = item.get("id")
 
+    # New media should show up on the next image asset listing
+    site.inventory_cache.invalidate((site.site_url, "media"))
+
     # -----------------------------------
     # Update title and alt text
     # -----------------------------------
-    meta_payload = {
-        "title": title,
-        "alt_text": alt_text
-    }
+    # Only needed when the site ignored the query params on upload
+    if item.get("alt_text") != alt_text:
+        meta_payload = {
+            "title": title,
+            "alt_text": alt_text
+        }
 
-    requests.post(
-        f"{endpoint}/{media_id}",
-        json=meta_payload,
-        auth=(username, app_password),
-        timeout=20
-    )
+        site.wp.post(
+            f"{endpoint}/{media_id}",
+            json=meta_payload,
+            timeout=(wp_client.connect_timeout, 20)
+        )
 
     # -----------------------------------
     # Normalize output
     # -----------------------------------
-    return {
+    asset = {
         "id": media_id,
         "date": item.get("date"),
         "src": item.get("source_url"),
@@ -635,5 +2077,47 @@ def upload_image_to_wordpress(arguments):
         }
     }
 
+    # The digest is complete now that the whole body has been sent
+    site.media_hashes.add(digest.hexdigest(), asset)
+    site.media_hashes.save_soon()
 
+    return asset
+
+
+def upload_images_to_wordpress(arguments):
+    """
+    MCP tool: upload many images to WordPress in one call.
+
+    Each item takes the same fields as upload_image_to_wordpress. Items are
+    uploaded concurrently on the shared upload pool and a failure in one
+    item does not stop the others.
+
+    :param images: List of image argument objects
+    :return: Dict with per-item results (in input order) and success/failure counts
+    """
+
+    images = arguments.get("images") or []
+
+    if not isinstance(images, list):
+        raise ValueError("images must be a list of image objects")
+
+    if len(images) > upload_batch_max:
+        raise ValueError(f"At most {upload_batch_max} images can be uploaded per call")
+
+    futures = [submit(upload_executor, upload_image_to_wordpress, image) for image in images]
+
+    results = []
+    for index, future in enumerate(futures):
+        try:
+            results.append({"index": index, "ok": True, "image": future.result()})
+        except Exception as e:
+            results.append({"index": index, "ok": False, "error": str(e)})
+
+    succeeded = sum(1 for result in results if result["ok"])
+
+    return {
+        "uploaded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
 
@@ -0,0 +1,187 @@
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# =============================================================================
+# About this module
+#
+# JSON serialization for MCP responses. Tool results are sent to clients as
+# compact JSON (not Python repr), using orjson when it is installed and the
+# standard library otherwise. Oversized results are trimmed structurally so
+# what the client receives is always valid JSON, with markers saying what was
+# left out.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# auto (orjson when installed), orjson, or json
+backend = os.getenv("MCP_JSON_BACKEND", "auto").lower()
+
+# Text appended to strings that were cut to fit a size limit
+truncation_marker = "… [truncated {omitted} chars]"
+
+# How many levels deep to look for lists/strings that can be trimmed
+_max_trim_depth = 4
+
+
+# =============================================================================
+# Serializer Backends
+# =============================================================================
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def set_backend(name_or_function):
+    """
+    Select the serializer used by dumps()/dumps_bytes().
+
+    :param name_or_function: "auto", "orjson", "json", or a fn(obj) -> bytes
+    """
+    global dumps_bytes, backend
+
+    if callable(name_or_function):
+        dumps_bytes = name_or_function
+        backend = getattr(name_or_function, "__name__", "custom")
+        return
+
+    name = name_or_function.lower()
+    if name == "orjson" and orjson is None:
+        raise ValueError("MCP_JSON_BACKEND=orjson but orjson is not installed")
+
+    if name in ("auto", "orjson") and orjson is not None:
+        dumps_bytes = _orjson_dumps
+        backend = "orjson"
+    elif name in ("auto", "json"):
+        dumps_bytes = _json_dumps
+        backend = "json"
+    else:
+        raise ValueError(f"Unknown JSON backend: {name_or_function}")
+
+
+dumps_bytes = _json_dumps
+set_backend(backend)
+
+
+def dumps(obj):
+    """
+    Serialize obj to a compact JSON string.
+    """
+    return dumps_bytes(obj).decode("utf-8")
+
+
+# =============================================================================
+# Size Limits
+# =============================================================================
+
+def _largest_trimmable(data, path=(), depth=0):
+    """
+    Find the biggest list or string inside data.
+
+    Large lists are trimmed as a whole rather than searched item by item;
+    only lists of one or two items (e.g. a single page) are looked into.
+
+    :return: Tuple of (path, value, size) or (None, None, 0); path is a tuple of keys/indexes
+    """
+    if isinstance(data, str):
+        return path, data, len(data)
+
+    if isinstance(data, list):
+        size = len(dumps_bytes(data))
+        if len(data) <= 2 and depth < _max_trim_depth:
+            for index, child in enumerate(data):
+                child_path, child_value, child_size = _largest_trimmable(child, path + (index,), depth + 1)
+                if child_path is not None and child_size > size * 0.8:
+                    return child_path, child_value, child_size
+        return path, data, size
+
+    best = (None, None, 0)
+    if isinstance(data, dict) and depth < _max_trim_depth:
+        for key, child in data.items():
+            if key == "truncated" or not isinstance(child, (dict, list, str)):
+                continue
+            found = _largest_trimmable(child, path + (key,), depth + 1)
+            if found[0] is not None and found[2] > best[2]:
+                best = found
+
+    return best
+
+
+def _replace_at(data, path, value):
+    """
+    Return a copy of data with the value at path replaced. Only the
+    containers along the path are copied; cached objects are never mutated.
+    """
+    if not path:
+        return value
+    head, rest = path[0], path[1:]
+    copy = dict(data) if isinstance(data, dict) else list(data)
+    copy[head] = _replace_at(data[head], rest, value)
+    return copy
+
+
+def fit(data, max_bytes):
+    """
+    Serialize data, trimming its largest lists and strings until the JSON is
+    at most max_bytes.
+
+    Trimmed lists keep their leading items (results are already ordered by
+    relevance or recency). A top-level dict result gets a "truncated" list
+    describing each cut, and cut strings end with a marker.
+
+    :param data: JSON-serializable tool result
+    :param max_bytes: Size limit for the serialized result (0 or None disables it)
+    :return: Tuple of (json bytes, possibly trimmed data)
+    """
+    encoded = dumps_bytes(data)
+    if not max_bytes or len(encoded) <= max_bytes:
+        return encoded, data
+
+    cuts = {}
+
+    for _ in range(12):
+        path, value, _ = _largest_trimmable(data)
+        if path is None or not value:
+            break
+
+        # Shrink proportionally, with headroom for the markers
+        ratio = max(min(max_bytes / len(encoded) * 0.9, 0.9), 0.0)
+        key = "/".join(str(part) for part in path)
+
+        if isinstance(value, str):
+            # A string trimmed before already ends with a marker; cut the original text
+            original = cuts[key]["original"] if key in cuts else value
+            keep = int(min(len(value), len(original)) * ratio)
+            trimmed = original[:keep] + truncation_marker.format(omitted=len(original) - keep)
+            cuts[key] = {"path": key, "omitted_chars": len(original) - keep, "original": original}
+        else:
+            keep = int(len(value) * ratio)
+            trimmed = value[:keep]
+            total = cuts[key]["total"] if key in cuts else len(value)
+            cuts[key] = {"path": key, "returned": keep, "total": total}
+
+        data = _replace_at(data, path, trimmed)
+        if isinstance(data, dict):
+            data = dict(data, truncated=[
+                {name: value for name, value in cut.items() if name != "original"}
+                for cut in cuts.values()
+            ])
+
+        encoded = dumps_bytes(data)
+        if len(encoded) <= max_bytes:
+            return encoded, data
+
+    # Nothing left to trim structurally: hard cut as a last resort
+    text = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    return dumps_bytes({"truncated": True, "partial_json": text}), {"truncated": True, "partial_json": text}
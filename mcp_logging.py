@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import mcp_json
+import tracing
+
+# =============================================================================
+# About this module
+#
+# Logging setup for the MCP server. Request threads only put records on an
+# in-memory queue; a background listener thread formats and writes them, so
+# a slow stdout/stderr never stalls a tool call. Payload previews are lazy
+# and bounded: they are only built when the record is actually emitted and
+# never walk more of a result than the preview limit, so logging cost no
+# longer grows with the size of a site inventory. Routine per-request lines
+# can be sampled, and full-ish result previews only appear at DEBUG level.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+level = os.getenv("MCP_LOG_LEVEL", "INFO").upper()
+
+# text or json (one JSON object per line, for log collectors)
+log_format = os.getenv("MCP_LOG_FORMAT", "text").lower()
+
+# Share of routine per-request log lines (marked sample=True) that are kept
+sample_rate = float(os.getenv("MCP_LOG_SAMPLE_RATE", "1.0"))
+
+# Longest payload preview, in characters
+preview_chars = int(os.getenv("MCP_LOG_PREVIEW_CHARS", "300"))
+
+# Emit from a background thread; records beyond the queue size are dropped
+async_logging = os.getenv("MCP_LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+queue_size = int(os.getenv("MCP_LOG_QUEUE_SIZE", "10000"))
+
+text_format = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+# =============================================================================
+# Bounded Previews
+# =============================================================================
+
+class Preview:
+    """
+    Lazy, bounded preview of a payload for use as a logging argument:
+
+        logger.debug("result: %s", Preview(result))
+
+    Nothing is serialized unless the record is emitted, and then at most
+    `limit` characters worth of the payload is visited.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = preview_chars if limit is None else limit
+
+    def __str__(self):
+        return preview(self.value, self.limit)
+
+
+def preview(value, limit=None):
+    """
+    Compact JSON-like text for value, cut at limit characters.
+    """
+    limit = preview_chars if limit is None else limit
+    parts = []
+    _walk(value, parts, [limit])
+    text = "".join(parts)
+    if len(text) > limit:
+        return text[:limit] + "…"
+    return text
+
+
+def _walk(value, parts, budget):
+    # budget is a one-item list so nested calls share what is left
+    if budget[0] <= 0:
+        return
+
+    if isinstance(value, str):
+        text = json.dumps(value[:budget[0] + 1], ensure_ascii=False)
+    elif isinstance(value, dict):
+        parts.append("{")
+        budget[0] -= 1
+        for position, (key, item) in enumerate(value.items()):
+            if budget[0] <= 0:
+                return
+            text = ("," if position else "") + json.dumps(str(key), ensure_ascii=False) + ":"
+            parts.append(text)
+            budget[0] -= len(text)
+            _walk(item, parts, budget)
+        parts.append("}")
+        budget[0] -= 1
+        return
+    elif isinstance(value, (list, tuple)):
+        parts.append("[")
+        budget[0] -= 1
+        for position, item in enumerate(value):
+            if budget[0] <= 0:
+                return
+            if position:
+                parts.append(",")
+                budget[0] -= 1
+            _walk(item, parts, budget)
+        parts.append("]")
+        budget[0] -= 1
+        return
+    elif value is None or isinstance(value, (bool, int, float)):
+        text = json.dumps(value)
+    else:
+        text = str(value)[:budget[0] + 1]
+
+    parts.append(text)
+    budget[0] -= len(text)
+
+
+# =============================================================================
+# Filters, Formatters and Handlers
+# =============================================================================
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp each record with the traced request id (runs on the calling thread,
+    where the request context is still available).
+    """
+
+    def filter(self, record):
+        record.request_id = tracing.request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only sample_rate of the records logged with extra={"sample": True}.
+    Warnings and errors are always kept.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One compact JSON object per record.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return mcp_json.dumps(entry)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks: when the queue is full the record is
+    dropped and counted instead.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure():
+    """
+    Install the MCP logging setup on the root logger (once per process).
+    """
+    global _listener
+
+    with _configure_lock:
+        root = logging.getLogger()
+        if getattr(root, "_mcp_configured", False):
+            return
+
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(text_format))
+
+        if async_logging:
+            handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+            _listener = QueueListener(handler.queue, output, respect_handler_level=False)
+            _listener.start()
+            atexit.register(_listener.stop)
+        else:
+            handler = output
+
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(SamplingFilter(sample_rate))
+
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+        root._mcp_configured = True
@@ -0,0 +1,322 @@
+import os
+import hmac
+import re
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# =============================================================================
+# About this module
+#
+# In-process metrics for the MCP server, exposed in the Prometheus text
+# format on GET /metrics (next to /mcp). Records per-method and per-tool
+# latency and errors, every upstream WordPress request by endpoint, and
+# in-flight concurrency. Cache and connection pool statistics are read from
+# the caches themselves at scrape time, so they add nothing to the hot path.
+#
+# Recording a sample is a dict lookup and a few integer updates under a
+# per-metric lock. Metrics are per process: with several server workers
+# (WEB_CONCURRENCY) each scrape sees the process that answered it.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# Set to false to disable recording and the /metrics endpoint
+enabled = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Bearer token required on GET /metrics; MCP_TOKEN when unset. With
+# neither set (e.g. several sites in MCP_TENANTS_FILE) /metrics refuses
+# every request unless METRICS_ALLOW_ANONYMOUS opts in to open scraping
+metrics_token = os.getenv("METRICS_TOKEN") or os.getenv("MCP_TOKEN")
+allow_anonymous = os.getenv("METRICS_ALLOW_ANONYMOUS", "false").lower() in ("1", "true", "yes")
+
+namespace = "wordpress_mcp"
+
+content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds (WordPress crawls and uploads can take a while)
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Numeric path segments are collapsed so each REST route is one label value
+_id_segment = re.compile(r"/\d+(?=/|$)")
+
+
+# =============================================================================
+# Metric Types
+# =============================================================================
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic count, optionally split by labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = f"{namespace}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return [(self.name + _format_labels(self.labelnames, labels), value) for labels, value in values]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, e.g. requests in flight.
+    """
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """
+    Distribution of observed values (seconds) in fixed buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=default_buckets):
+        self.name = f"{namespace}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._values.items()]
+
+        lines = []
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = ("le", _format_value(bound))
+                lines.append((self.name + "_bucket" + _format_labels(self.labelnames, labels, le), cumulative))
+            lines.append((self.name + "_sum" + _format_labels(self.labelnames, labels), total))
+            lines.append((self.name + "_count" + _format_labels(self.labelnames, labels), count))
+        return lines
+
+
+# =============================================================================
+# Server Metrics
+# =============================================================================
+
+request_duration = Histogram("request_duration_seconds", "Time to handle an MCP JSON-RPC request", ("method",))
+request_errors = Counter("request_errors_total", "MCP JSON-RPC requests that raised an error", ("method",))
+requests_in_flight = Gauge("requests_in_flight", "MCP JSON-RPC requests being handled")
+
+tool_duration = Histogram("tool_duration_seconds", "Time to run an MCP tool call", ("tool",))
+tool_errors = Counter("tool_errors_total", "MCP tool calls that raised an error", ("tool",))
+
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds",
+    "Time until WordPress answered (response headers for streamed downloads)",
+    ("method", "endpoint")
+)
+upstream_requests = Counter(
+    "upstream_requests_total", "Requests sent to WordPress", ("method", "endpoint", "status")
+)
+upstream_received = Counter(
+    "upstream_response_bytes_total", "Response body bytes received from WordPress", ("method", "endpoint")
+)
+upstream_sent = Counter(
+    "upstream_request_bytes_total", "Request body bytes sent to WordPress", ("method", "endpoint")
+)
+upstream_in_flight = Gauge("upstream_requests_in_flight", "Requests to WordPress awaiting a response")
+upstream_retries = Counter(
+    "upstream_retries_total", "WordPress requests retried, by the status or error that caused it",
+    ("method", "endpoint", "reason")
+)
+upstream_queue_wait = Histogram(
+    "upstream_queue_wait_seconds", "Time WordPress requests waited for the read/write rate limiter",
+    ("budget",), buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+_metrics = [
+    request_duration, request_errors, requests_in_flight,
+    tool_duration, tool_errors,
+    upstream_duration, upstream_requests, upstream_received, upstream_sent, upstream_in_flight,
+    upstream_retries, upstream_queue_wait
+]
+
+# fn() -> list of (name, type, help, [(labels dict, value)]) read at scrape time
+_collectors = []
+
+
+def register_collector(collector):
+    """
+    Add a function whose metrics are read on every scrape, e.g. cache stats.
+
+    :param collector: fn() -> list of (name, type, help, samples) where
+                      samples is a list of (labels dict, value)
+    """
+    _collectors.append(collector)
+
+
+# =============================================================================
+# Recording
+# =============================================================================
+
+@contextmanager
+def track_request(method, tool=None):
+    """
+    Time one JSON-RPC request (and its tool, for tools/call), counting it as
+    in flight meanwhile and as an error if it raises.
+    """
+    if not enabled:
+        yield
+        return
+
+    requests_in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        request_errors.inc(method)
+        if tool is not None:
+            tool_errors.inc(tool)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        requests_in_flight.dec()
+        request_duration.observe(elapsed, method)
+        if tool is not None:
+            tool_duration.observe(elapsed, tool)
+
+
+def endpoint_label(url):
+    """
+    Bounded label for an upstream URL: the REST route with ids collapsed
+    (e.g. wp/v2/pages/:id), or "file" for anything outside /wp-json/ such
+    as media downloads.
+    """
+    path = urlparse(url).path
+    marker = path.find("/wp-json/")
+    if marker < 0:
+        return "file"
+    return _id_segment.sub("/:id", path[marker + len("/wp-json/"):].rstrip("/")) or "index"
+
+
+def observe_upstream(method, url, status, seconds, received=0, sent=0):
+    """
+    Record one request to WordPress.
+
+    :param status: HTTP status code, or None when no response arrived
+    """
+    if not enabled:
+        return
+    endpoint = endpoint_label(url)
+    upstream_duration.observe(seconds, method, endpoint)
+    upstream_requests.inc(method, endpoint, str(status) if status is not None else "error")
+    if received:
+        upstream_received.inc(method, endpoint, amount=received)
+    if sent:
+        upstream_sent.inc(method, endpoint, amount=sent)
+
+
+def observe_queue_wait(budget, seconds):
+    """
+    Record how long one WordPress request waited for its rate limiter.
+    """
+    if enabled:
+        upstream_queue_wait.observe(seconds, budget)
+
+
+# =============================================================================
+# Exposition
+# =============================================================================
+
+def check_token(auth_header):
+    """
+    :return: True when the bearer token matches, or anonymous scraping is allowed
+    """
+    if allow_anonymous:
+        return True
+    if not metrics_token or not auth_header:
+        return False
+    return hmac.compare_digest(auth_header.encode("utf-8"), f"Bearer {metrics_token}".encode("utf-8"))
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {_format_value(value)}" for name, value in metric.samples())
+
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception:
+            # A failing collector must not take the whole scrape down
+            continue
+        for name, kind, documentation, samples in families:
+            name = f"{namespace}_{name}"
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                lines.append(f"{name}{label_text} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,69 @@
+import os
+import sys
+
+# =============================================================================
+# About this module
+#
+# Production entry point. Picks the serving mode at startup:
+#
+#   MCP_SERVER_MODE=wsgi (default)  gunicorn + Flask app (app.py), threaded
+#                                   workers so slow WordPress calls do not
+#                                   block a whole worker process
+#   MCP_SERVER_MODE=asgi            uvicorn + asyncio app (asgi_app.py)
+#
+# Usage: python serve.py
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+mode = os.getenv("MCP_SERVER_MODE", "wsgi").lower()
+port = os.getenv("PORT", "8080")
+
+# Processes; each keeps its own WordPress connection pool and caches
+workers = os.getenv("WEB_CONCURRENCY", "2")
+
+# Threads per gunicorn worker (wsgi mode only)
+threads = os.getenv("GUNICORN_THREADS", "16")
+
+# Seconds before a silent worker is restarted (long crawls and uploads)
+timeout = os.getenv("GUNICORN_TIMEOUT", "120")
+
+
+# =============================================================================
+# Launch
+# =============================================================================
+
+def command():
+    """
+    Build the server command line for the selected mode.
+    """
+    if mode == "asgi":
+        return [
+            "uvicorn", "asgi_app:app",
+            "--host", "0.0.0.0",
+            "--port", port,
+            "--workers", workers,
+            "--timeout-keep-alive", "75"
+        ]
+
+    if mode == "wsgi":
+        return [
+            "gunicorn", "app:app",
+            "--bind", f"0.0.0.0:{port}",
+            "--worker-class", "gthread",
+            "--workers", workers,
+            "--threads", threads,
+            "--timeout", timeout,
+            "--keep-alive", "75"
+        ]
+
+    raise SystemExit(f"Unknown MCP_SERVER_MODE: {mode} (expected 'wsgi' or 'asgi')")
+
+
+if __name__ == "__main__":
+    args = command()
+    print("Starting:", " ".join(args), file=sys.stderr)
+    os.execvp(args[0], args)
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+import wp_client
+import wp_cache
+import wp_search
+
+# =============================================================================
+# About this module
+#
+# Multi-tenant routing: one server process can serve many WordPress sites.
+# Each MCP bearer token maps to a tenant (a site and its Application
+# Password). A tenant's WordPressClient (connection pool, retry policy,
+# circuit breaker, rate limits) and its caches are only built the first
+# time a request for it arrives, and are dropped again after it has been
+# idle for MCP_TENANT_IDLE_SECONDS, so 40 mostly quiet sites cost little
+# more than one busy one.
+#
+# The tenant of the request being handled lives in a context variable that
+# follows the request onto worker threads (mcp_helper.submit, the batch and
+# stream pools), so the tool code in mcp_helper reads it with current().
+#
+# Without MCP_TENANTS_FILE the server runs as before: a single tenant built
+# from MCP_TOKEN, WORDPRESS_SITE_URL, WORDPRESS_USERNAME and
+# APPLICATION_PASSWORD.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# JSON file listing the tenants (see load_config for the format)
+tenants_file = os.getenv("MCP_TENANTS_FILE")
+
+# Active tenants idle for longer than this are evicted (their pools closed
+# and caches dropped); 0 keeps them forever
+idle_seconds = float(os.getenv("MCP_TENANT_IDLE_SECONDS", "900"))
+
+# Most tenants kept active at once; the least recently used idle one is
+# evicted beyond this (0 = no limit)
+max_active = int(os.getenv("MCP_TENANT_MAX_ACTIVE", "64"))
+
+# Seconds between sweeps for idle tenants (done on the request path)
+sweep_interval = float(os.getenv("MCP_TENANT_SWEEP_SECONDS", "60"))
+
+# Per-tenant rate limit keys accepted in the tenants file
+limit_keys = (
+    "read_rate", "read_burst", "read_max_in_flight",
+    "write_rate", "write_burst", "write_max_in_flight"
+)
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("mcp_tenant", default=None)
+
+
+# =============================================================================
+# Tenant
+# =============================================================================
+
+class Tenant:
+    """
+    One WordPress site with its own client and caches.
+
+    :param name: Short name used in logs
+    :param site_url: Base WordPress URL (e.g. https://example.com)
+    :param username: WordPress username with Application Password access
+    :param app_password: WordPress Application Password
+    :param limits: Optional rate limit overrides (see limit_keys)
+    """
+
+    def __init__(self, name, site_url, username=None, app_password=None, limits=None):
+        self.name = name
+        self.site_url = site_url
+        self.wp = wp_client.WordPressClient(site_url, username, app_password, limits=limits)
+
+        self.inventory_cache = wp_cache.InventoryCache()
+        self.content_cache = wp_cache.ContentCache()
+        self.search_indexes = wp_search.SearchIndexCache()
+        self.page_writes = wp_cache.PageWriteLog()
+        self.media_hashes = wp_cache.MediaHashIndex(wp_cache.MediaHashIndex.path_for_site(site_url))
+
+        # Flipped off the first time the site answers a batch request with 404/405
+        self.batch_api_available = True
+
+        self.media_seed_lock = threading.Lock()
+        self.media_seed_started = False
+
+        self.last_used = time.monotonic()
+        self.active_requests = 0
+
+    def close(self):
+        self.media_hashes.save()
+        self.wp.close()
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+def load_config(path=None):
+    """
+    Tenant settings keyed by bearer token.
+
+    The tenants file is JSON, either a list or {"tenants": [...]}, with one
+    object per site:
+
+        {"name": "acme", "token": "...", "site_url": "https://acme.com",
+         "username": "mcp", "application_password": "...",
+         "limits": {"read_rate": 10}}
+
+    :return: Dict of token -> settings dict
+    """
+    path = path or tenants_file
+    if not path:
+        # Single site from the environment (keyed by None when MCP_TOKEN is
+        # unset, which no request can match)
+        if not (os.getenv("MCP_TOKEN") or os.getenv("WORDPRESS_SITE_URL")):
+            return {}
+        return {os.getenv("MCP_TOKEN"): {
+            "name": "default",
+            "site_url": os.getenv("WORDPRESS_SITE_URL"),
+            "username": os.getenv("WORDPRESS_USERNAME"),
+            "application_password": os.getenv("APPLICATION_PASSWORD")
+        }}
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("tenants", []) if isinstance(data, dict) else data
+
+    config = {}
+    for position, entry in enumerate(entries):
+        token = entry.get("token")
+        if not token or not entry.get("site_url"):
+            raise ValueError(f"Tenant {position} in {path} needs a token and a site_url")
+        if token in config:
+            raise ValueError(f"Tenant {entry.get('name') or position} in {path} reuses another tenant's token")
+        unknown = set(entry.get("limits") or {}) - set(limit_keys)
+        if unknown:
+            raise ValueError(f"Unknown limits for tenant {entry.get('name') or position}: {', '.join(sorted(unknown))}")
+        config[token] = dict(entry, name=entry.get("name") or entry["site_url"])
+    return config
+
+
+class TenantRegistry:
+    """
+    Maps bearer tokens to tenants, building them lazily and evicting idle ones.
+
+    :param config: Dict of token -> settings (see load_config)
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.evictions = 0
+        self._active = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def resolve(self, token):
+        """
+        :return: The Tenant for a bearer token, or None if the token is unknown
+        """
+        settings = self.config.get(token)
+        if settings is None:
+            return None
+
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            tenant = self._active.get(token)
+            if tenant is None:
+                tenant = self._active[token] = Tenant(
+                    settings["name"],
+                    settings["site_url"],
+                    settings.get("username"),
+                    settings.get("application_password"),
+                    limits=settings.get("limits")
+                )
+                logger.info("Tenant %s loaded (%d active)", tenant.name, len(self._active))
+            self._active.move_to_end(token)
+            tenant.last_used = now
+
+            if now - self._last_sweep >= sweep_interval or (max_active and len(self._active) > max_active):
+                self._last_sweep = now
+                evicted = self._evict_idle(now, keep=tenant)
+
+        # Closing saves the media hash index, so do it outside the lock
+        for idle in evicted:
+            idle.close()
+        return tenant
+
+    def _evict_idle(self, now, keep=None):
+        # Called with the lock held; never evicts a tenant serving a request,
+        # nor keep (the tenant being resolved, not yet activated)
+        evicted = []
+        for token, tenant in list(self._active.items()):
+            over_limit = max_active and len(self._active) > max_active
+            expired = idle_seconds and now - tenant.last_used > idle_seconds
+            if (over_limit or expired) and tenant.active_requests == 0 and tenant is not keep:
+                del self._active[token]
+                evicted.append(tenant)
+                self.evictions += 1
+                logger.info("Tenant %s evicted after %.0fs idle", tenant.name, now - tenant.last_used)
+        return evicted
+
+    def active(self):
+        """
+        Snapshot of the tenants currently loaded.
+        """
+        with self._lock:
+            return list(self._active.values())
+
+    def default(self):
+        """
+        The only tenant when a single one is configured, else None.
+        """
+        if len(self.config) != 1:
+            return None
+        return self.resolve(next(iter(self.config)))
+
+    def close(self):
+        with self._lock:
+            tenants = list(self._active.values())
+            self._active.clear()
+        for tenant in tenants:
+            tenant.close()
+
+
+registry = TenantRegistry(load_config())
+
+
+# =============================================================================
+# Current Tenant
+# =============================================================================
+
+@contextmanager
+def activate(tenant):
+    """
+    Make tenant the current one for the code (and worker threads that copy
+    the context) inside this block.
+    """
+    release = hold(tenant)
+    token = _current.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
+        release()
+
+
+def hold(tenant):
+    """
+    Keep tenant from being evicted until the returned function is called,
+    for work that outlives the block that started it (a streamed response).
+
+    :return: fn() that releases the hold; calling it again does nothing
+    """
+    released = False
+
+    def release():
+        nonlocal released
+        with registry._lock:
+            if released:
+                return
+            released = True
+            tenant.active_requests -= 1
+            tenant.last_used = time.monotonic()
+
+    with registry._lock:
+        tenant.active_requests += 1
+    return release
+
+
+def current():
+    """
+    The tenant of the request being handled. Outside a request (scripts,
+    background jobs) the single configured tenant is used, if there is one.
+
+    :raises RuntimeError: No tenant is active and several are configured
+    """
+    tenant = _current.get()
+    if tenant is None:
+        tenant = registry.default()
+        if tenant is None:
+            raise RuntimeError("No WordPress site selected for this request")
+    return tenant
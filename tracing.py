@@ -0,0 +1,212 @@
+import os
+import re
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+import metrics
+
+# =============================================================================
+# About this module
+#
+# Per-request timing breakdown for /mcp calls. With MCP_TRACE enabled each
+# response carries a Server-Timing header (JSON parse, auth, dispatch, each
+# upstream WordPress request, tool result encoding, serialization) and an
+# X-Request-Id that also appears in the log lines for that request. In
+# debug mode the same breakdown is added to the JSON-RPC result under
+# _meta.debug.
+#
+# The active trace lives in a context variable, so WordPress requests made
+# on worker threads (submitted via mcp_helper.submit) are attributed to the
+# call that caused them. With MCP_TRACE=off no trace is created and every
+# hook returns after a single context variable lookup.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# off (default), header (Server-Timing + X-Request-Id) or debug (also _meta.debug)
+mode = os.getenv("MCP_TRACE", "off").lower()
+enabled = mode in ("header", "debug")
+debug_block = mode == "debug"
+
+# Most individual upstream requests listed in the Server-Timing header; the
+# debug block lists up to MCP_TRACE_MAX_UPSTREAM * 5
+max_upstream_entries = int(os.getenv("MCP_TRACE_MAX_UPSTREAM", "20"))
+
+# Incoming request ids are reused when they look sane
+_request_id_pattern = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+_current = contextvars.ContextVar("mcp_trace", default=None)
+
+
+# =============================================================================
+# Trace
+# =============================================================================
+
+class Trace:
+    """
+    Timings collected for one HTTP request to /mcp.
+
+    :param request_id: Id echoed in X-Request-Id and the logs
+    """
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.upstream = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        # Repeated phases (e.g. encode for each entry of a batch) add up
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_upstream(self, method, url, status, seconds):
+        with self._lock:
+            self.upstream.append((method, metrics.endpoint_label(url), status, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """
+        Server-Timing header value. Durations are in milliseconds; upstream
+        requests made in parallel overlap, so their sum can exceed dispatch.
+        """
+        with self._lock:
+            phases = list(self.phases.items())
+            upstream = list(self.upstream)
+
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases]
+
+        if upstream:
+            total = sum(seconds for _, _, _, seconds in upstream)
+            entries.append(f'upstream;dur={total * 1000:.2f};desc="{len(upstream)} requests"')
+            for position, (method, endpoint, status, seconds) in enumerate(upstream[:max_upstream_entries]):
+                entries.append(f'wp{position};dur={seconds * 1000:.2f};desc="{method} {endpoint} {status}"')
+
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def debug(self):
+        """
+        The breakdown so far as a JSON-serializable dict (milliseconds).
+        """
+        with self._lock:
+            phases = list(self.phases.items())
+            upstream = list(self.upstream)
+
+        return {
+            "request_id": self.request_id,
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in phases},
+            "upstream_requests": len(upstream),
+            "upstream_ms": round(sum(seconds for _, _, _, seconds in upstream) * 1000, 2),
+            "upstream": [
+                {"method": method, "endpoint": endpoint, "status": status, "ms": round(seconds * 1000, 2)}
+                for method, endpoint, status, seconds in upstream[:max_upstream_entries * 5]
+            ],
+            "elapsed_ms": round(self.elapsed() * 1000, 2)
+        }
+
+
+# =============================================================================
+# Hooks
+# =============================================================================
+
+@contextmanager
+def tracing(request_id=None):
+    """
+    Trace the request handled inside this block.
+
+    :param request_id: Incoming X-Request-Id header, if any
+    :return: The Trace, or None when tracing is off
+    """
+    if not enabled:
+        yield None
+        return
+
+    if not request_id or not _request_id_pattern.match(request_id):
+        request_id = uuid.uuid4().hex[:16]
+
+    trace = Trace(request_id)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def request_id():
+    """
+    Id of the traced request, or "-" when tracing is off (for log lines).
+    """
+    trace = _current.get()
+    return trace.request_id if trace is not None else "-"
+
+
+@contextmanager
+def span(name):
+    """
+    Time a phase of the current request (no-op when not tracing).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def record_phase(name, seconds):
+    """
+    Add time spent outside a span (e.g. rate limiter waits) to a phase.
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def record_upstream(method, url, status, seconds):
+    """
+    Attribute one WordPress request to the current request, if traced.
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.add_upstream(method, url, status, seconds)
+
+
+def with_debug(response, trace):
+    """
+    Add the timing breakdown to a JSON-RPC response under result._meta.debug
+    (debug mode only). The response is copied, never modified.
+    """
+    if trace is None or not debug_block:
+        return response
+    if not isinstance(response, dict) or not isinstance(response.get("result"), dict):
+        return response
+
+    result = response["result"]
+    meta = dict(result.get("_meta") or {}, debug=trace.debug())
+    return dict(response, result=dict(result, _meta=meta))
+
+
+def response_headers(trace):
+    """
+    Headers to add to the HTTP response for a traced request.
+    """
+    if trace is None:
+        return {}
+    return {"Server-Timing": trace.server_timing(), "X-Request-Id": trace.request_id}
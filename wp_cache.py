@@ -0,0 +1,629 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows: saves from several processes are then not serialized
+    fcntl = None
+
+# =============================================================================
+# About this module
+#
+# In-process caches for WordPress data. Agents tend to ask for the same site
+# inventory and the same content over and over within a conversation, so the
+# tool functions in mcp_helper.py read through these caches and only go to
+# WordPress for what has actually changed.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# Seconds an inventory is served straight from memory before a delta sync
+inventory_ttl = float(os.getenv("INVENTORY_TTL_SECONDS", "60"))
+
+# Seconds between id reconciliations (detects deleted / unpublished items)
+inventory_reconcile_interval = float(os.getenv("INVENTORY_RECONCILE_SECONDS", "600"))
+
+# Byte budget for cached post/page content
+content_cache_max_bytes = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Seconds cached content is returned without revalidating against WordPress
+content_fresh_seconds = float(os.getenv("CONTENT_FRESH_SECONDS", "5"))
+
+# Seconds a page's last-written digest is trusted to skip an identical write
+page_write_digest_ttl = float(os.getenv("PAGE_WRITE_DIGEST_TTL_SECONDS", "900"))
+
+# Most pages whose last-written digests are remembered
+page_write_log_max = int(os.getenv("PAGE_WRITE_LOG_MAX", "5000"))
+
+# Directory holding the per-site media content-hash index files
+media_hash_index_dir = os.getenv("MEDIA_HASH_INDEX_DIR", tempfile.gettempdir())
+
+# Seconds after a change before the media hash index is written to disk, so
+# a burst of uploads costs one write
+media_hash_save_delay = float(os.getenv("MEDIA_HASH_SAVE_DELAY_SECONDS", "5"))
+
+
+# =============================================================================
+# Site Inventory Cache
+# =============================================================================
+
+class _InventoryEntry:
+    def __init__(self, id_field="id"):
+        self.id_field = id_field
+        self.lock = threading.Lock()
+        self.items = {}
+        self.snapshot = None
+        self.max_modified = None
+        self.synced_at = 0.0
+        self.reconciled_at = 0.0
+
+
+class InventoryCache:
+    """
+    Incremental cache of post/page inventories keyed by (site, content type).
+
+    The first call does a full crawl. After that, calls within the TTL are
+    served from memory, and later calls ask WordPress only for items modified
+    since the newest `modified` timestamp already held. Deleted items are
+    dropped by a periodic, ids-only reconciliation.
+
+    The cache does no HTTP itself; callers pass in the fetch functions.
+    """
+
+    def __init__(self, ttl=None, reconcile_interval=None):
+        self.ttl = inventory_ttl if ttl is None else ttl
+        self.reconcile_interval = (
+            inventory_reconcile_interval if reconcile_interval is None else reconcile_interval
+        )
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key, id_field):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _InventoryEntry(id_field)
+            return entry
+
+    def get(self, key, fetch_all, fetch_modified_since, fetch_ids, id_field="id"):
+        """
+        Return the inventory list for key, syncing with WordPress if stale.
+
+        :param key: Tuple of (site_url, content_type)
+        :param fetch_all: fn() -> list of normalized items (full crawl)
+        :param fetch_modified_since: fn(timestamp) -> items modified since timestamp
+        :param fetch_ids: fn() -> list of ids currently published
+        :param id_field: Name of the id field in the normalized items
+        :return: List of normalized items, newest first
+        """
+        entry = self._entry(key, id_field)
+        now = time.monotonic()
+
+        if entry.snapshot is not None and now - entry.synced_at < self.ttl:
+            self.hits += 1
+            return entry.snapshot
+
+        if entry.snapshot is None:
+            entry.lock.acquire()
+        elif not entry.lock.acquire(blocking=False):
+            # Another thread is already syncing: serve what we have rather than wait
+            self.hits += 1
+            return entry.snapshot
+
+        try:
+            # Re-check once we hold the lock, a concurrent caller may have synced
+            if entry.snapshot is not None and time.monotonic() - entry.synced_at < self.ttl:
+                self.hits += 1
+                return entry.snapshot
+
+            self.misses += 1
+
+            if entry.snapshot is None:
+                self._replace(entry, fetch_all())
+                entry.reconciled_at = time.monotonic()
+            else:
+                changed = fetch_modified_since(entry.max_modified) if entry.max_modified else fetch_all()
+                if time.monotonic() - entry.reconciled_at >= self.reconcile_interval:
+                    self._merge(entry, changed, live_ids=set(fetch_ids()))
+                    entry.reconciled_at = time.monotonic()
+                else:
+                    self._merge(entry, changed)
+
+            entry.synced_at = time.monotonic()
+            return entry.snapshot
+
+        finally:
+            entry.lock.release()
+
+    def peek(self, key, item_id):
+        """
+        Look up a single item in a fresh inventory without syncing.
+
+        :return: The normalized item, or None if unknown or the inventory is stale
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.synced_at >= self.ttl:
+            return None
+        return entry.items.get(item_id)
+
+    def invalidate(self, key):
+        """
+        Force the next get() for key to sync. Cached items are kept so the
+        sync stays a cheap delta rather than a full crawl.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            entry.synced_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _replace(self, entry, items):
+        entry.items = {item[entry.id_field]: item for item in items}
+        self._rebuild(entry)
+
+    def _merge(self, entry, changed, live_ids=None):
+        # Delta syncs re-send the newest item(s), so only rebuild the snapshot
+        # when something really changed. An unchanged snapshot keeps its
+        # identity, which lets derived data (e.g. search indexes) be reused.
+        changed = [item for item in changed if entry.items.get(item[entry.id_field]) != item]
+        deleted = set(entry.items) - live_ids if live_ids is not None else set()
+        if not changed and not deleted:
+            return
+
+        items = dict(entry.items)
+        for item in changed:
+            items[item[entry.id_field]] = item
+        for item_id in deleted:
+            del items[item_id]
+        entry.items = items
+        self._rebuild(entry)
+
+    def _rebuild(self, entry):
+        # Match WordPress' default collection order: newest first
+        entry.snapshot = sorted(
+            entry.items.values(),
+            key=lambda item: (item.get("date") or "", item.get(entry.id_field) or 0),
+            reverse=True
+        )
+        entry.max_modified = max(
+            (item.get("modified") for item in entry.items.values() if item.get("modified")),
+            default=None
+        )
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries)
+        }
+
+
+# =============================================================================
+# Content Cache
+# =============================================================================
+
+class ContentEntry:
+    def __init__(self, value, etag=None, last_modified=None, size=0):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.validated_at = time.monotonic()
+
+    @property
+    def modified(self):
+        return (self.value or {}).get("modified")
+
+    def is_fresh(self, max_age):
+        return time.monotonic() - self.validated_at < max_age
+
+
+class ContentCache:
+    """
+    Bounded LRU cache of fetched post/page content keyed by (type, id).
+
+    Entries keep the ETag / Last-Modified validators WordPress sent with them
+    so callers can revalidate with a conditional GET. Least recently used
+    entries are evicted once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=None, fresh_seconds=None):
+        self.max_bytes = content_cache_max_bytes if max_bytes is None else max_bytes
+        self.fresh_seconds = content_fresh_seconds if fresh_seconds is None else fresh_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_many(self, keys, servable):
+        """
+        Look up many keys for serving, counting a hit for each one that can
+        be served and a miss for the rest.
+
+        :param keys: Cache keys
+        :param servable: fn(key) -> entry safe to serve without a request, or None
+        :return: Dict of key -> entry for the keys that can be served
+        """
+        found = {}
+        for key in keys:
+            entry = servable(key)
+            if entry is not None:
+                found[key] = entry
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def count(self, outcome):
+        """
+        Count the outcome of a lookup: "hits", "revalidations" or "misses".
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def put(self, key, value, etag=None, last_modified=None):
+        size = _content_size(value)
+        entry = ContentEntry(value, etag, last_modified, size)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+
+            # Items larger than the whole budget are not worth caching
+            if size > self.max_bytes:
+                return entry
+
+            self._entries[key] = entry
+            self.bytes += size
+
+            while self.bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+
+        return entry
+
+    def touch(self, entry):
+        """
+        Mark an entry as just revalidated against WordPress.
+        """
+        entry.validated_at = time.monotonic()
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+def _content_size(value):
+    """
+    Approximate memory cost of a normalized content item, dominated by the
+    rendered HTML.
+    """
+    if not value:
+        return 0
+    content = (value.get("content") or {}).get("rendered") or ""
+    title = (value.get("title") or {}).get("rendered") or ""
+    return len(content) + len(title) + 512
+
+
+# =============================================================================
+# Page Write Log
+# =============================================================================
+
+class PageWrite:
+    def __init__(self, digests, modified=None, summary=None):
+        self.digests = digests
+        self.modified = modified
+        self.summary = summary
+        self.written_at = time.monotonic()
+
+
+class PageWriteLog:
+    """
+    Remembers a digest of each field last written to a page, so a repeated
+    write with the same payload can be skipped and a write that changes only
+    some fields can send just those.
+
+    Digests are trusted for ttl seconds after the write; callers should also
+    compare the stored `modified` timestamp with what WordPress currently
+    reports, in case the page was edited elsewhere.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = page_write_digest_ttl if ttl is None else ttl
+        self.max_entries = page_write_log_max if max_entries is None else max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.partial = 0
+
+    @staticmethod
+    def digest(value):
+        if not isinstance(value, str):
+            value = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        :return: The PageWrite for key if it is within the ttl, else None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.written_at >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def changed_fields(self, key, payload):
+        """
+        Names of the payload fields that differ from the last write to key.
+
+        :return: List of field names, or None when there is no usable record
+                 (every field must be sent)
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return [
+            name for name, value in payload.items()
+            if entry.digests.get(name) != self.digest(value)
+        ]
+
+    def record(self, key, payload, modified=None, summary=None):
+        """
+        Record a successful write of payload (all or some fields) to key.
+        """
+        digests = {name: self.digest(value) for name, value in payload.items()}
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None and time.monotonic() - previous.written_at < self.ttl:
+                # A partial write only carries the fields that changed
+                digests = dict(previous.digests, **digests)
+
+            self._entries[key] = PageWrite(digests, modified, summary)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "skipped": self.skipped,
+            "partial": self.partial,
+            "entries": len(self._entries)
+        }
+
+
+# =============================================================================
+# Media Hash Index
+# =============================================================================
+
+class MediaHashIndex:
+    """
+    Persistent map from image content hash (sha256) to the WordPress media
+    asset holding those bytes, so repeated uploads of the same image can be
+    answered without creating another attachment.
+
+    The index is kept in memory and written to a JSON file (one per site)
+    so it survives restarts. Writes are debounced (save_soon) and merge
+    with what is already in the file under a lock, so several server
+    processes can share one index without overwriting each other.
+
+    :param path: JSON file to load from and save to (None keeps it in memory only)
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._by_hash = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        # Digests dropped since the last save, kept out of the merge with the file
+        self._removed = set()
+        self._save_timer = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @staticmethod
+    def path_for_site(site_url):
+        """
+        Default index file for a site, inside MEDIA_HASH_INDEX_DIR.
+        """
+        name = hashlib.sha1((site_url or "").encode("utf-8")).hexdigest()[:16]
+        return os.path.join(media_hash_index_dir, f"wordpress_mcp_media_{name}.json")
+
+    def _load(self):
+        self._by_hash = self._read()
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A corrupt or unreadable index only costs re-hashing the library
+            return {}
+        return data.get("hashes") or {}
+
+    def get(self, digest):
+        """
+        :return: The stored asset dict for a content hash, or None
+        """
+        with self._lock:
+            asset = self._by_hash.get(digest)
+            if asset is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return asset
+
+    def add(self, digest, asset):
+        """
+        Record the asset holding the bytes with this hash.
+
+        :param digest: Hex sha256 of the image bytes
+        :param asset: Asset dict as returned by upload_image_to_wordpress (must have "id")
+        """
+        with self._lock:
+            # Keep the first (oldest) attachment for a hash, it is the one
+            # pages are most likely to already reference
+            self._by_hash.setdefault(digest, asset)
+            self._removed.discard(digest)
+            self._dirty = True
+
+    def ids(self):
+        with self._lock:
+            return {asset.get("id") for asset in self._by_hash.values()}
+
+    def discard(self, media_id):
+        """
+        Drop every entry pointing at a media id (e.g. a deleted attachment).
+        """
+        with self._lock:
+            self._remove([digest for digest, asset in self._by_hash.items() if asset.get("id") == media_id])
+
+    def _remove(self, digests):
+        # Called with the lock held
+        for digest in digests:
+            del self._by_hash[digest]
+        if digests:
+            self._removed.update(digests)
+            self._dirty = True
+
+    def prune(self, live_ids):
+        """
+        Drop entries whose media id no longer exists in the library.
+
+        Ids newer than any in live_ids are kept: they belong to uploads made
+        after the library listing was taken.
+        """
+        newest = max(live_ids, default=0)
+        with self._lock:
+            stale = [
+                digest for digest, asset in self._by_hash.items()
+                if asset.get("id") not in live_ids and (asset.get("id") or 0) <= newest
+            ]
+            self._remove(stale)
+            return len(stale)
+
+    def save_soon(self):
+        """
+        Save on a background timer MEDIA_HASH_SAVE_DELAY_SECONDS from now,
+        unless a save is already scheduled.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(media_hash_save_delay, self._timed_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _timed_save(self):
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    def save(self):
+        """
+        Write the index to its file if it changed.
+
+        Entries another process has written to the file since it was read
+        are merged in (and picked up here too). The file is locked for the
+        merge and replaced atomically, so a crash never leaves a
+        half-written index.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path + ".lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                by_hash = self._read()
+                with self._lock:
+                    removed = set(self._removed)
+                    for digest, asset in by_hash.items():
+                        if digest not in removed:
+                            self._by_hash.setdefault(digest, asset)
+                    data = {"hashes": dict(self._by_hash)}
+
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+
+            with self._lock:
+                self._removed -= removed
+        except OSError:
+            # Persistence is best effort; the in-memory index still works
+            with self._lock:
+                self._dirty = True
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._by_hash)
+        }
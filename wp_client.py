@@ -0,0 +1,764 @@
+import os
+import time
+import random
+import tempfile
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+import metrics
+import tracing
+
+# =============================================================================
+# About this module
+#
+# Shared HTTP client layer for every call this MCP server makes to WordPress.
+# A single requests.Session keeps TCP+TLS connections to WORDPRESS_SITE_URL
+# alive between tool calls and between the pages of a paginated crawl, so
+# only the first request pays for the handshake.
+#
+# Every request also goes through the same failure policy: idempotent
+# requests are retried with jittered backoff (waiting out Retry-After when
+# WordPress sends one), each tool call runs under a deadline that bounds
+# all of its requests, and a circuit breaker fails fast while the site is
+# down instead of letting every call wait for its own timeout.
+#
+# Outbound traffic is also governed so parallel tool calls cannot overwhelm
+# a small origin: reads and writes each have a token bucket (requests per
+# second with a burst allowance) and a cap on requests in flight. Time spent
+# waiting for either is exported as metrics and in Server-Timing, and a 429
+# from WordPress pauses the whole budget rather than just one request.
+#
+# URLs on other hosts (src_url image downloads from third-party sites) go
+# through a second plain pooled session instead: their failures and 429s
+# say nothing about WordPress, so they never touch its breaker or budgets,
+# and the Application Password is never sent to them.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# Connection pool settings
+pool_connections = int(os.getenv("WORDPRESS_HTTP_POOL_CONNECTIONS", "4"))
+pool_maxsize = int(os.getenv("WORDPRESS_HTTP_POOL_MAXSIZE", "32"))
+
+# Default timeouts (seconds) applied when a caller does not pass its own
+connect_timeout = float(os.getenv("WORDPRESS_HTTP_CONNECT_TIMEOUT", "5"))
+read_timeout = float(os.getenv("WORDPRESS_HTTP_READ_TIMEOUT", "60"))
+
+user_agent = os.getenv("WORDPRESS_HTTP_USER_AGENT", "wordpress-mcp")
+
+# Retries for idempotent requests (GET, HEAD) after connection errors,
+# timeouts and 429/502/503/504 responses, with full-jitter exponential backoff
+retry_attempts = int(os.getenv("WORDPRESS_HTTP_RETRIES", "2"))
+retry_backoff = float(os.getenv("WORDPRESS_HTTP_RETRY_BACKOFF_SECONDS", "0.25"))
+retry_backoff_max = float(os.getenv("WORDPRESS_HTTP_RETRY_BACKOFF_MAX_SECONDS", "5"))
+
+# Longest Retry-After waited out; a longer one is returned to the caller as is
+retry_after_max = float(os.getenv("WORDPRESS_HTTP_RETRY_AFTER_MAX_SECONDS", "10"))
+
+retry_statuses = frozenset((429, 502, 503, 504))
+idempotent_methods = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# Circuit breaker: after this many consecutive failed requests (retries used
+# up on connection errors, timeouts or 502/503/504) requests fail fast for
+# WORDPRESS_BREAKER_RESET_SECONDS, then a single trial request decides
+# whether to close it again. 0 disables.
+breaker_failures = int(os.getenv("WORDPRESS_BREAKER_FAILURES", "5"))
+breaker_reset_seconds = float(os.getenv("WORDPRESS_BREAKER_RESET_SECONDS", "30"))
+breaker_statuses = frozenset((502, 503, 504))
+
+# Rate limits toward WordPress, separately for reads (GET, HEAD) and writes.
+# RATE is sustained requests per second (0 = unlimited), BURST the bucket
+# size, MAX_IN_FLIGHT the most concurrent requests (0 = unlimited)
+read_rate = float(os.getenv("WORDPRESS_READ_RATE", "25"))
+read_burst = int(os.getenv("WORDPRESS_READ_BURST", "50"))
+read_max_in_flight = int(os.getenv("WORDPRESS_READ_MAX_IN_FLIGHT", "16"))
+write_rate = float(os.getenv("WORDPRESS_WRITE_RATE", "5"))
+write_burst = int(os.getenv("WORDPRESS_WRITE_BURST", "10"))
+write_max_in_flight = int(os.getenv("WORDPRESS_WRITE_MAX_IN_FLIGHT", "6"))
+
+# Monotonic time by which the current operation must be done (see deadline())
+_deadline = contextvars.ContextVar("wp_deadline", default=None)
+
+# Largest media file accepted for upload, and the chunk size used to stream it
+upload_max_bytes = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+upload_chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+# Sources of unknown length are spooled before uploading: in memory up to
+# this size, in a temporary file beyond it
+upload_spool_memory_bytes = int(os.getenv("UPLOAD_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+
+
+# =============================================================================
+# WordPress Client
+# =============================================================================
+
+class WordPressClient:
+    """
+    Pooled, keep-alive HTTP client bound to one WordPress site.
+
+    :param site_url: Base WordPress URL (e.g. https://example.com)
+    :param username: WordPress username with Application Password access
+    :param app_password: WordPress Application Password
+    :param limits: Optional overrides of the read/write rate limits, e.g.
+                   {"read_rate": 10, "write_max_in_flight": 2}
+    """
+
+    def __init__(self, site_url, username=None, app_password=None, limits=None):
+        self.site_url = (site_url or "").rstrip("/")
+        self.auth = HTTPBasicAuth(username, app_password) if username else None
+        self.timeout = (connect_timeout, read_timeout)
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False
+        )
+
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Connection": "keep-alive"
+        })
+
+        # Other hosts: no retries, breaker or rate limits
+        self.external_session = requests.Session()
+        self.external_session.mount("https://", HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize))
+        self.external_session.mount("http://", HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize))
+        self.external_session.headers.update({"User-Agent": user_agent})
+
+        self.breaker = CircuitBreaker()
+        limits = limits or {}
+        self.read_limiter = RateLimiter(
+            "read",
+            limits.get("read_rate", read_rate),
+            limits.get("read_burst", read_burst),
+            limits.get("read_max_in_flight", read_max_in_flight)
+        )
+        self.write_limiter = RateLimiter(
+            "write",
+            limits.get("write_rate", write_rate),
+            limits.get("write_burst", write_burst),
+            limits.get("write_max_in_flight", write_max_in_flight)
+        )
+
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._retry_count = 0
+
+    def url(self, path):
+        """
+        Build a full REST URL from a path relative to /wp-json/.
+
+        :param path: e.g. "wp/v2/pages" or "wp/v2/pages/12"
+        :return: Absolute URL
+        """
+        return f"{self.site_url}/wp-json/{path.lstrip('/')}"
+
+    def is_site_url(self, url):
+        """
+        True if url points at this WordPress site rather than another host.
+        """
+        return url == self.site_url or url.startswith(self.site_url + "/")
+
+    def request(self, method, url, authenticated=False, **kwargs):
+        """
+        Send a request through the shared session.
+
+        Idempotent methods are retried on connection errors, timeouts and
+        retryable statuses while the current deadline allows; the last
+        response is returned (or the last error raised) once retries run out.
+        URLs on other hosts are sent once on the external session.
+
+        :param method: HTTP method
+        :param url: Absolute URL (use url() for WordPress REST paths)
+        :param authenticated: Attach the WordPress Application Password
+        :return: requests.Response
+        :raises CircuitOpen: The site is failing and the breaker is open
+        :raises DeadlineExceeded: The current operation ran out of time
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if not self.is_site_url(url):
+            return self._transmit(self.external_session, method, url, kwargs)
+        if authenticated:
+            kwargs.setdefault("auth", self.auth)
+
+        # The breaker judges whole requests, retries included, so sporadic
+        # errors that a retry absorbs never count against the site
+        if not self.breaker.allow():
+            raise CircuitOpen(
+                f"WordPress at {self.site_url} is failing; requests paused for "
+                f"{self.breaker.retry_in():.0f}s more"
+            )
+
+        retries = retry_attempts if method.upper() in idempotent_methods else 0
+        attempt = 0
+        outcome = None
+
+        try:
+            while True:
+                response, error = None, None
+                try:
+                    response = self._send(method, url, kwargs)
+                except DeadlineExceeded:
+                    raise
+                except requests.RequestException as e:
+                    error = e
+
+                if response is not None and response.status_code == 429:
+                    # Slow every caller down, not only this one
+                    self.limiter(method).pause(min(_retry_after(response) or retry_backoff, retry_after_max))
+
+                delay = _retry_delay(attempt, response, error) if attempt < retries else None
+                left = remaining()
+                if delay is None or (left is not None and delay >= left):
+                    if error is not None:
+                        outcome = not isinstance(error, (requests.ConnectionError, requests.Timeout))
+                        raise error
+                    outcome = response.status_code not in breaker_statuses
+                    return response
+
+                self._retry(method, url, response, error, delay)
+                attempt += 1
+        finally:
+            self.breaker.record(outcome)
+
+    def _retry(self, method, url, response, error, delay):
+        # Count, release the failed response's connection and back off
+        with self._lock:
+            self._retry_count += 1
+        metrics.upstream_retries.inc(
+            method, metrics.endpoint_label(url), type(error).__name__ if error else str(response.status_code)
+        )
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+
+    def limiter(self, method):
+        """
+        The read or write RateLimiter that governs a request method.
+        """
+        return self.read_limiter if method.upper() in idempotent_methods else self.write_limiter
+
+    def _send(self, method, url, kwargs):
+        # One attempt: wait for the rate limiter, then send
+        limiter = self.limiter(method)
+        waited = limiter.acquire(remaining())
+        if waited is None:
+            raise DeadlineExceeded(
+                f"Deadline exceeded waiting for a {limiter.name} slot before {method} {metrics.endpoint_label(url)}"
+            )
+        metrics.observe_queue_wait(limiter.name, waited)
+        if waited:
+            tracing.record_phase("wp_queue", waited)
+
+        try:
+            with self._lock:
+                self._request_count += 1
+            return self._transmit(self.session, method, url, kwargs)
+        finally:
+            limiter.release()
+
+    def _transmit(self, session, method, url, kwargs):
+        # Send on session with socket timeouts shortened to the deadline,
+        # recording metrics and the Server-Timing phase
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded before {method} {metrics.endpoint_label(url)}")
+            kwargs = dict(kwargs, timeout=_bounded_timeout(kwargs.get("timeout"), left))
+
+        metrics.upstream_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.RequestException:
+            elapsed = time.perf_counter() - started
+            metrics.observe_upstream(method, url, None, elapsed)
+            tracing.record_upstream(method, url, None, elapsed)
+            raise
+        finally:
+            metrics.upstream_in_flight.dec()
+
+        elapsed = time.perf_counter() - started
+        tracing.record_upstream(method, url, response.status_code, elapsed)
+        metrics.observe_upstream(
+            method,
+            url,
+            response.status_code,
+            elapsed,
+            received=_received_bytes(response, kwargs.get("stream")),
+            sent=_sent_bytes(response.request.body)
+        )
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault("authenticated", True)
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        kwargs.setdefault("authenticated", True)
+        return self.request("PUT", url, **kwargs)
+
+    def stats(self):
+        """
+        Connection pool statistics across every host this client has talked to.
+
+        A pool "hit" is a request served on an already open connection, a
+        "miss" is a request that had to open a new one.
+
+        :return: Dict with request, hit and miss counts plus per-host detail
+        """
+        hosts = {}
+        total_requests = 0
+        total_connections = 0
+
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+
+            requests_made = pool.num_requests
+            connections_made = pool.num_connections
+            total_requests += requests_made
+            total_connections += connections_made
+
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": requests_made,
+                "hits": max(requests_made - connections_made, 0),
+                "misses": connections_made
+            }
+
+        return {
+            "requests": self._request_count,
+            "retries": self._retry_count,
+            "breaker": self.breaker.stats(),
+            "limits": {"read": self.read_limiter.stats(), "write": self.write_limiter.stats()},
+            "pool_hits": max(total_requests - total_connections, 0),
+            "pool_misses": total_connections,
+            "pool_maxsize": pool_maxsize,
+            "hosts": hosts
+        }
+
+    def close(self):
+        self.session.close()
+        self.external_session.close()
+
+
+def _retry_delay(attempt, response, error):
+    """
+    Seconds to wait before retrying, or None when the outcome is final.
+    """
+    if error is not None:
+        retryable = isinstance(error, (requests.ConnectionError, requests.Timeout))
+    else:
+        retryable = response.status_code in retry_statuses
+    if not retryable:
+        return None
+
+    backoff = random.uniform(0, min(retry_backoff_max, retry_backoff * (2 ** attempt)))
+
+    retry_after = _retry_after(response) if response is not None else None
+    if retry_after is None:
+        return backoff
+    if retry_after > retry_after_max:
+        return None
+    # Spread clients told to come back at the same moment
+    return retry_after + random.uniform(0, retry_backoff)
+
+
+def _retry_after(response):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bounded_timeout(timeout, left):
+    # Never wait on a socket longer than the operation has left
+    if isinstance(timeout, tuple):
+        return tuple(left if value is None else min(value, left) for value in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def _received_bytes(response, streamed):
+    # Streamed bodies have not been read yet; fall back to the declared size
+    if streamed:
+        return int(response.headers.get("Content-Length") or 0)
+    return len(response.content)
+
+
+def _sent_bytes(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    # StreamingBody: by now the whole body has been relayed
+    return getattr(body, "bytes_read", 0)
+
+
+# =============================================================================
+# Deadlines and Circuit Breaker
+# =============================================================================
+
+class DeadlineExceeded(requests.Timeout):
+    """
+    The operation's deadline passed before a WordPress request could be sent.
+    """
+
+
+class CircuitOpen(requests.ConnectionError):
+    """
+    Raised without contacting WordPress while the circuit breaker is open.
+    """
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Bound every WordPress request made inside this block, including those
+    on worker threads that copy the context (mcp_helper.submit), to finish
+    within seconds. Socket timeouts are shortened to the time left and no
+    retry is attempted past it. A nested deadline never extends an outer one.
+
+    :param seconds: Time budget; None or 0 means no deadline
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        expires = min(expires, outer)
+
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """
+    Seconds left before the current deadline, or None without one.
+    """
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one WordPress site.
+
+    closed: requests flow, failures are counted. open: requests are refused
+    until reset_seconds have passed. half_open: one trial request is let
+    through; success closes the breaker, failure opens it again.
+
+    :param failures: Consecutive failures that open the breaker (0 disables it)
+    :param reset_seconds: How long the breaker stays open before a trial
+    """
+
+    def __init__(self, failures=None, reset_seconds=None):
+        self.failures = breaker_failures if failures is None else failures
+        self.reset_seconds = breaker_reset_seconds if reset_seconds is None else reset_seconds
+        self.state = "closed"
+        self.opened = 0
+        self.rejected = 0
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        :return: True if a request may be sent now
+        """
+        if self.failures <= 0:
+            return True
+
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok):
+        """
+        Record the outcome of a request let through by allow().
+
+        :param ok: True/False, or None when it ended without a verdict on
+                   the site (e.g. the caller's deadline ran out)
+        """
+        if self.failures <= 0:
+            return
+
+        with self._lock:
+            if ok is None:
+                # Free the trial slot so the next request can decide
+                self._trial = False
+                return
+            if ok:
+                self._consecutive = 0
+                self._trial = False
+                self.state = "closed"
+                return
+
+            self._consecutive += 1
+            if self.state == "half_open" or (self.state == "closed" and self._consecutive >= self.failures):
+                self.state = "open"
+                self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def retry_in(self):
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(self.reset_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "opened": self.opened, "rejected": self.rejected}
+
+
+# =============================================================================
+# Rate Limiting
+# =============================================================================
+
+class RateLimiter:
+    """
+    Token bucket plus in-flight cap for one class of WordPress requests.
+
+    acquire() waits until a token is available and fewer than max_in_flight
+    requests are outstanding; release() gives the in-flight slot back when
+    the response has arrived. pause() stops handing out tokens for a while,
+    e.g. after WordPress answered 429.
+
+    :param name: Budget name used in metrics ("read" or "write")
+    :param rate: Sustained requests per second (0 = unlimited)
+    :param burst: Most tokens that can accumulate while idle
+    :param max_in_flight: Most requests outstanding at once (0 = unlimited)
+    """
+
+    def __init__(self, name, rate, burst, max_in_flight):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiting = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a token and an in-flight slot.
+
+        :param timeout: Most seconds to wait (None waits as long as it takes)
+        :return: Seconds waited, or None if the timeout ran out first
+        """
+        started = time.monotonic()
+        give_up = None if timeout is None else started + timeout
+
+        with self._condition:
+            queued = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_needed(now)
+                    if wait <= 0:
+                        break
+                    if give_up is not None and now >= give_up:
+                        return None
+                    if not queued:
+                        queued = True
+                        self.waiting += 1
+                    # Slot waits are woken by release(); token waits time out
+                    self._condition.wait(wait if give_up is None else min(wait, give_up - now))
+
+                if self.rate > 0:
+                    self._tokens -= 1
+                self.in_flight += 1
+                waited = time.monotonic() - started
+                self.wait_seconds += waited
+                return waited
+            finally:
+                if queued:
+                    self.waiting -= 1
+
+    def _wait_needed(self, now):
+        # Seconds until a request may go out; called with the lock held
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        wait = max(self._paused_until - now, 0.0)
+        if self.rate > 0 and self._tokens < 1:
+            wait = max(wait, (1 - self._tokens) / self.rate)
+        if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+            wait = max(wait, 1.0)
+        return wait
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        """
+        Hand out no tokens for the next seconds (the bucket is also drained).
+        """
+        with self._condition:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def stats(self):
+        with self._condition:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3)
+            }
+
+
+# =============================================================================
+# Streaming Request Bodies
+# =============================================================================
+
+class StreamingBody:
+    """
+    File-like request body that relays a streamed download into an upload.
+
+    Wraps a response opened with stream=True so its bytes are sent on to
+    another request chunk by chunk, holding at most one chunk in memory.
+    When the source sends a Content-Length it is exposed as `len` so the
+    upload goes out with a Content-Length too; otherwise pass the body
+    through spool() first, since many PHP setups read an empty body from a
+    chunked request.
+
+    :param response: requests.Response opened with stream=True
+    :param max_bytes: Abort once more than this many bytes have been read
+    :param chunk_size: Bytes pulled from the source per read
+    :param on_read: Optional fn(byte_count) called as chunks are pulled, for progress
+    :param digest: Optional hashlib object updated with every chunk, so the
+                   content hash is known once the upload has been sent
+    """
+
+    def __init__(self, response, max_bytes=None, chunk_size=None, on_read=None, digest=None):
+        self.max_bytes = upload_max_bytes if max_bytes is None else max_bytes
+        self.bytes_read = 0
+        self.on_read = on_read
+        self.digest = digest
+
+        length = response.headers.get("Content-Length")
+        if length and not response.headers.get("Content-Encoding"):
+            self.len = int(length)
+            if self.len > self.max_bytes:
+                raise ValueError(
+                    f"Image is {self.len} bytes, larger than the {self.max_bytes} byte upload limit"
+                )
+
+        self._chunks = response.iter_content(chunk_size or upload_chunk_size)
+        self._chunk = b""
+        self._offset = 0
+
+    def _next_chunk(self):
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            if self.bytes_read > self.max_bytes:
+                raise ValueError(
+                    f"Image is larger than the {self.max_bytes} byte upload limit"
+                )
+            if self.digest is not None:
+                self.digest.update(chunk)
+            if self.on_read is not None:
+                self.on_read(len(chunk))
+            return chunk
+        return b""
+
+    def read(self, size=-1):
+        if self._offset >= len(self._chunk):
+            self._chunk = self._next_chunk()
+            self._offset = 0
+            if not self._chunk:
+                return b""
+
+        if size is None or size < 0:
+            end = len(self._chunk)
+        else:
+            end = min(self._offset + size, len(self._chunk))
+
+        data = self._chunk[self._offset:end]
+        self._offset = end
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read()
+            if not data:
+                return
+            yield data
+
+
+def spool(body, max_memory=None):
+    """
+    Copy a streamed body of unknown length into a SpooledTemporaryFile so
+    it can be uploaded with a Content-Length. The upload size limit is
+    still enforced by the StreamingBody as it is read.
+
+    :param body: StreamingBody (or any iterable of bytes chunks)
+    :param max_memory: Bytes kept in memory before spilling to disk
+                       (default UPLOAD_SPOOL_MEMORY_BYTES)
+    :return: File rewound to the start, with its size as `len`
+    """
+    spooled = tempfile.SpooledTemporaryFile(
+        max_size=upload_spool_memory_bytes if max_memory is None else max_memory
+    )
+    try:
+        for chunk in body:
+            spooled.write(chunk)
+    except Exception:
+        spooled.close()
+        raise
+
+    spooled.len = spooled.tell()
+    spooled.seek(0)
+    return spooled
@@ -0,0 +1,205 @@
+import os
+import re
+import heapq
+import threading
+from bisect import bisect_left
+from html import unescape
+from urllib.parse import urlparse
+
+# =============================================================================
+# About this module
+#
+# In-process inverted index over the site inventory (posts, pages and media)
+# so the `query` argument of get_wordpress_site_details and
+# get_wordpress_image_assets can return a handful of ranked matches instead
+# of the whole site. Indexes are built from the inventory lists wp_cache
+# already holds and are rebuilt only when an inventory actually changes.
+# =============================================================================
+
+
+# =============================================================================
+# Variables
+# =============================================================================
+
+# Maximum number of ranked matches a query returns
+search_max_results = int(os.getenv("SEARCH_MAX_RESULTS", "50"))
+
+# Query words that carry no meaning for matching titles, slugs or file names
+stop_words = {
+    "a", "an", "and", "are", "all", "any", "about", "by", "can", "for", "from",
+    "find", "get", "give", "have", "i", "in", "is", "it", "list", "me", "my",
+    "of", "on", "or", "our", "please", "show", "site", "that", "the", "this",
+    "to", "us", "we", "what", "which", "with", "wordpress", "you"
+}
+
+_token_pattern = re.compile(r"[a-z0-9]+")
+
+# Shortest query token that is also matched as a prefix (e.g. "land" -> "landing")
+_min_prefix_length = 3
+
+# Most vocabulary terms a single prefix may expand to
+_max_prefix_expansions = 50
+
+
+# =============================================================================
+# Tokenization
+# =============================================================================
+
+def tokenize(text):
+    """
+    Split text into lowercase alphanumeric tokens.
+
+    :param text: Any string (HTML entities in rendered titles are decoded)
+    :return: List of tokens
+    """
+    if not text:
+        return []
+    return _token_pattern.findall(unescape(str(text)).lower())
+
+
+def url_path(url):
+    """
+    Path part of a URL, so the host name does not match every query.
+    """
+    if not url:
+        return ""
+    return urlparse(url).path
+
+
+# =============================================================================
+# Search Index
+# =============================================================================
+
+class SearchIndex:
+    """
+    Inverted index over a list of documents.
+
+    :param docs: List of dicts (normalized inventory items)
+    :param fields: List of (getter, weight) pairs; getter(doc) returns text
+    """
+
+    def __init__(self, docs, fields):
+        self.docs = docs
+        postings = {}
+
+        for position, doc in enumerate(docs):
+            for getter, weight in fields:
+                for token in tokenize(getter(doc)):
+                    doc_weights = postings.setdefault(token, {})
+                    # A token scores its best field, not the sum of repeats
+                    if doc_weights.get(position, 0) < weight:
+                        doc_weights[position] = weight
+
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+    def _expand(self, token):
+        """
+        Vocabulary terms a query token matches: itself plus, for longer
+        tokens, every term it is a prefix of.
+        """
+        if len(token) < _min_prefix_length:
+            return [token] if token in self.postings else []
+
+        terms = []
+        start = bisect_left(self.vocabulary, token)
+        for term in self.vocabulary[start:start + _max_prefix_expansions]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query, limit=None, scored=False):
+        """
+        Rank documents against a free-text query.
+
+        Each query token contributes the best weight it reaches in a
+        document (exact matches score higher than prefix matches). Only
+        documents matching the most query tokens are returned.
+
+        :param query: Free-text query
+        :param limit: Maximum number of results (default SEARCH_MAX_RESULTS)
+        :param scored: Return (score, document) pairs instead of documents
+        :return: List of matching documents, best first
+        """
+        limit = search_max_results if limit is None else limit
+        tokens = [token for token in tokenize(query) if token not in stop_words]
+        if not tokens:
+            return []
+
+        scores = {}
+        matched = {}
+
+        for token in dict.fromkeys(tokens):
+            best = {}
+            for term in self._expand(token):
+                exact = 1.0 if term == token else 0.5
+                for position, weight in self.postings[term].items():
+                    score = weight * exact
+                    if best.get(position, 0) < score:
+                        best[position] = score
+
+            for position, score in best.items():
+                scores[position] = scores.get(position, 0) + score
+                matched[position] = matched.get(position, 0) + 1
+
+        # Only keep documents matching as many query tokens as the best one,
+        # so a common word does not drag in the whole inventory. Rank those
+        # by score, then by inventory order (newest first).
+        best_matched = max(matched.values(), default=0)
+        candidates = [position for position in scores if matched[position] == best_matched]
+        top = heapq.nlargest(
+            limit,
+            candidates,
+            key=lambda position: (scores[position], -position)
+        )
+        if scored:
+            return [(scores[position], self.docs[position]) for position in top]
+        return [self.docs[position] for position in top]
+
+
+class SearchIndexCache:
+    """
+    Keeps one SearchIndex per inventory key and rebuilds it only when the
+    inventory list it was built from has been replaced.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, key, docs, fields):
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None and cached.docs is docs:
+                return cached
+
+        index = SearchIndex(docs, fields)
+
+        with self._lock:
+            self._indexes[key] = index
+            self.builds += 1
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+# =============================================================================
+# Inventory Field Definitions
+# =============================================================================
+
+# Posts and pages: the slug is the last path segment of the URL
+content_fields = [
+    (lambda doc: doc.get("title"), 3),
+    (lambda doc: url_path(doc.get("url")), 2)
+]
+
+# Media: alt text, file name and source URL path
+media_fields = [
+    (lambda doc: doc.get("alt"), 3),
+    (lambda doc: doc.get("file_name"), 2),
+    (lambda doc: url_path(doc.get("src")), 1)
+]